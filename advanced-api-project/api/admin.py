@@ -23,5 +23,3 @@ class BookAdmin(admin.ModelAdmin):
     list_display = ['id', 'title', 'publication_year', 'author']
     list_filter = ['publication_year', 'author']
     search_fields = ['title', 'author__name']
-
----
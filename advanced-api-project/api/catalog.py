@@ -0,0 +1,180 @@
+"""
+Streaming catalog import used by the import_catalog management command.
+
+The import is a chain of generators, so only one batch of rows is in memory
+at a time whatever the size of the file:
+
+    read_csv / read_ndjson  ->  clean_rows  ->  batched  ->  import_batches
+
+Every row carries the byte offset just past it in the source file. Each batch
+saves that offset to the source's CatalogImport row in the transaction that
+creates its books, so the checkpoint never gets ahead of or behind the
+committed books, and a later run over the same file starts reading there.
+The row also keeps the file's size and modification time: an offset into a
+file that has since been replaced or edited would resume mid-record.
+
+Input rows have a title, a publication_year and an author *name*; authors
+are created on first sight and remembered in a name -> id map.
+"""
+import csv
+import json
+import os
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import Author, Book, CatalogImport
+from .search import index_books
+from .serializers import BookSerializer
+
+TITLE_MAX_LENGTH = Book._meta.get_field('title').max_length
+AUTHOR_MAX_LENGTH = Author._meta.get_field('name').max_length
+
+
+class CatalogRowError(ValueError):
+    pass
+
+
+def _lines(file, offset):
+    """
+    Yield (line, offset just past the line) for a binary file, from offset on.
+    """
+    file.seek(offset)
+    for raw in file:
+        offset += len(raw)
+        yield raw.decode('utf-8'), offset
+
+
+def read_csv(file, offset=0):
+    """
+    Yield (offset, row dict) for each record of a CSV file with a header row.
+    Quoted fields may span lines.
+    """
+    position = 0
+
+    def text(lines):
+        # csv.reader pulls one line at a time, so position is always the end
+        # of the last line of the record it has just returned
+        nonlocal position
+        for line, position in lines:
+            yield line
+
+    header = next(csv.reader(text(_lines(file, 0))), [])
+    header = [name.strip().lstrip('\ufeff') for name in header]
+    for values in csv.reader(text(_lines(file, max(offset, position)))):
+        if values:
+            yield position, dict(zip(header, values))
+
+
+def read_ndjson(file, offset=0):
+    """
+    Yield (offset, row dict) for each line of a newline-delimited JSON file.
+    """
+    for line, end in _lines(file, offset):
+        if line.strip():
+            try:
+                yield end, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield end, CatalogRowError(f'invalid JSON: {exc.msg}')
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def clean_row(row):
+    """
+    Return (title, publication_year, author_name) or raise CatalogRowError.
+    Applies the same publication year rule as BookSerializer.
+    """
+    if isinstance(row, CatalogRowError):
+        raise row
+    if not isinstance(row, dict):
+        raise CatalogRowError('expected an object')
+    title = str(row.get('title') or '').strip()
+    author = str(row.get('author') or '').strip()
+    if not title or len(title) > TITLE_MAX_LENGTH:
+        raise CatalogRowError(f'title must be 1-{TITLE_MAX_LENGTH} characters')
+    if not author or len(author) > AUTHOR_MAX_LENGTH:
+        raise CatalogRowError(f'author must be 1-{AUTHOR_MAX_LENGTH} characters')
+    try:
+        year = int(row.get('publication_year'))
+    except (TypeError, ValueError):
+        raise CatalogRowError('publication_year must be an integer')
+    try:
+        BookSerializer().validate_publication_year(year)
+    except serializers.ValidationError as exc:
+        raise CatalogRowError(str(exc.detail[0]))
+    return title, year, author
+
+
+def clean_rows(rows, on_error):
+    """
+    Yield (offset, cleaned row) for valid rows. Invalid rows are skipped
+    after calling on_error(row number, message).
+    """
+    for number, (offset, row) in enumerate(rows, start=1):
+        try:
+            yield offset, clean_row(row)
+        except CatalogRowError as exc:
+            on_error(number, str(exc))
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class AuthorMap:
+    """
+    Author name -> id, filled from the database and by creating missing
+    authors, one query of each kind per batch.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.created = 0
+
+    def resolve(self, names):
+        missing = set(names) - self.ids.keys()
+        if not missing:
+            return
+        for pk, name in Author.objects.filter(name__in=missing).values_list('pk', 'name'):
+            self.ids.setdefault(name, pk)
+        new = [Author(name=name) for name in missing - self.ids.keys()]
+        for author in Author.objects.bulk_create(new):
+            self.ids[author.name] = author.pk
+        self.created += len(new)
+
+
+def file_fingerprint(path):
+    """
+    Return the file's size and modification time, which change whenever the
+    file is rewritten, as a string for CatalogImport.fingerprint.
+    """
+    stat = os.stat(path)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def import_batches(batches, authors, checkpoint=None):
+    """
+    Create and index the books of every batch, one transaction per batch,
+    and yield (offset, books created) after each commit. The checkpoint, a
+    CatalogImport, is saved in the same transaction.
+    """
+    for batch in batches:
+        offset = batch[-1][0]
+        with transaction.atomic():
+            authors.resolve(author for _, (_, _, author) in batch)
+            books = [
+                Book(title=title, publication_year=year, author_id=authors.ids[author])
+                for _, (title, year, author) in batch
+            ]
+            Book.objects.bulk_create(books)
+            index_books(books, new=True)
+            if checkpoint is not None:
+                checkpoint.offset = offset
+                checkpoint.books += len(books)
+                checkpoint.save(update_fields=['offset', 'books', 'updated_at'])
+        yield offset, len(books)
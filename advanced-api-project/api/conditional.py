@@ -0,0 +1,51 @@
+"""
+Conditional GET for the book endpoints.
+
+Responses carry an ETag computed from database state, never from the
+rendered body:
+
+    book detail      the book's updated_at (also sent as Last-Modified)
+    book list page   the ids and updated_at of the books on the page, and the
+                     page's count/next/previous
+    export           max(updated_at) and count of all matching books
+
+together with the URL (filters, ordering, page) and the negotiated media
+type. A GET with a matching If-None-Match, or for a single book an
+If-Modified-Since that is not older than updated_at, gets 304 Not Modified
+before anything is serialized.
+
+Lists send no Last-Modified: deleting a book does not move max(updated_at),
+so a date alone cannot tell a client that its copy is stale.
+"""
+import hashlib
+import json
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(request, *state):
+    """
+    Return a quoted ETag for state as represented at request's URL in the
+    negotiated media type.
+    """
+    key = json.dumps([request.get_full_path(), request.accepted_renderer.media_type, *state], default=str)
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Return a 304 response if the client's copy is current, otherwise None.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None):
+    response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    return response
@@ -0,0 +1,78 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog import READERS, AuthorMap, batched, clean_rows, file_fingerprint, import_batches
+from api.models import CatalogImport
+
+# Invalid rows are counted; only the first few are printed
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = 'Stream Authors and Books from a CSV or NDJSON file into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (title,publication_year,author) or NDJSON file')
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Books written per transaction (default: 1000)')
+        parser.add_argument('--restart', action='store_true',
+                            help="Discard the file's checkpoint and import from the start")
+        parser.add_argument('--progress-every', type=int, default=100000,
+                            help='Print progress every N books (default: 100000)')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.isfile(path):
+            raise CommandError(f'No such file: {path}')
+        file_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        if options['restart']:
+            CatalogImport.objects.filter(source=path).delete()
+        fingerprint = file_fingerprint(path)
+        checkpoint, created = CatalogImport.objects.get_or_create(source=path, defaults={'fingerprint': fingerprint})
+        if not created and checkpoint.fingerprint != fingerprint:
+            raise CommandError(
+                f'{path} has changed since it was imported up to byte {checkpoint.offset}; '
+                'use --restart to import it from the start'
+            )
+        if not created and checkpoint.offset >= os.path.getsize(path):
+            self.stdout.write(
+                f'{path} was already imported ({checkpoint.books} books); use --restart to import it again'
+            )
+        elif not created:
+            self.stdout.write(
+                f'Resuming at byte {checkpoint.offset} ({checkpoint.books} books already imported); '
+                'row numbers below count from there'
+            )
+
+        invalid = 0
+
+        def report_error(number, message):
+            nonlocal invalid
+            invalid += 1
+            if invalid <= MAX_REPORTED_ERRORS:
+                self.stderr.write(f'Row {number}: {message}')
+
+        authors = AuthorMap()
+        started = time.monotonic()
+        imported = next_report = 0
+        with open(path, 'rb') as file:
+            rows = clean_rows(READERS[file_format](file, checkpoint.offset), report_error)
+            batches = batched(rows, options['batch_size'])
+            for _, count in import_batches(batches, authors, checkpoint):
+                imported += count
+                if imported >= next_report + options['progress_every']:
+                    next_report = imported
+                    self.stdout.write(f'{imported} books, {imported / (time.monotonic() - started):.0f} rows/s')
+
+        # The checkpoint is kept at the end of the file, so running the same
+        # import again does not duplicate it (use --restart for that)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} books and {authors.created} new authors in {elapsed:.2f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/s); {invalid} invalid rows skipped'
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.search import INDEX_BATCH_SIZE, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the book autocomplete index from all Books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE,
+                            help=f'Books indexed per batch (default: {INDEX_BATCH_SIZE})')
+        parser.add_argument('--progress-every', type=int, default=100000,
+                            help='Print progress every N books (default: 100000)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        indexed = next_report = 0
+        for indexed in rebuild_index(options['batch_size']):
+            if indexed >= next_report + options['progress_every']:
+                next_report = indexed
+                self.stdout.write(f'{indexed} books indexed ({time.monotonic() - started:.0f}s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} books in {time.monotonic() - started:.1f}s'
+        ))
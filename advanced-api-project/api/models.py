@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 
 
 class Author(models.Model):
@@ -7,6 +9,7 @@ class Author(models.Model):
     
     Fields:
         name (CharField): String field storing the author's full name (max 200 characters).
+        updated_at (DateTimeField): Time of the last save.
     
     Relationships:
         Has a one-to-many relationship with the Book model.
@@ -16,6 +19,7 @@ class Author(models.Model):
         __str__: Returns the author's name as the string representation.
     """
     name = models.CharField(max_length=200)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -33,6 +37,7 @@ class Book(models.Model):
         publication_year (IntegerField): Integer field for the year the book was published.
         author (ForeignKey): Foreign key linking to the Author model, establishing 
                             a many-to-one relationship from Book to Author.
+        updated_at (DateTimeField): Time of the last change, used for conditional GETs.
     
     Relationships:
         Each book belongs to one author (many-to-one relationship).
@@ -50,13 +55,92 @@ class Book(models.Model):
     author = models.ForeignKey(
         Author,
         on_delete=models.CASCADE,
-        related_name='books'
+        related_name='books',
+        # Covered by the (author, title) index
+        db_index=False
     )
+    # Set by save() and bulk_create(); bulk_update() and QuerySet.update()
+    # callers must set it themselves. Drives the ETags of the book endpoints.
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} ({self.publication_year})"
 
     class Meta:
         ordering = ['title']
+        # One index per filter/ordering combination of BookListView, checked
+        # by api.test_query_plans. An equality filter on title needs nothing
+        # more: it selects few enough rows to sort.
+        indexes = [
+            # no filter, ordered by title
+            models.Index(fields=['title'], name='book_title_idx'),
+            # ?publication_year=, or no filter ordered by publication_year
+            models.Index(fields=['publication_year', 'title'], name='book_year_title_idx'),
+            # ?author= ordered by title
+            models.Index(fields=['author', 'title'], name='book_author_title_idx'),
+            # ?author= ordered by publication_year, ?author=&publication_year=
+            models.Index(fields=['author', 'publication_year', 'title'], name='book_author_year_title_idx'),
+        ]
 
----
+
+class BookSearchPrefix(models.Model):
+    """
+    Autocomplete index entry: a prefix of a word of a book's title or of its
+    author's name, with the score the book ranks by for that prefix.
+    
+    Rows are written by api.search.index_books(); see api.search for the
+    scoring and how lookups use the (prefix, -score, book) index.
+    """
+    prefix = models.CharField(max_length=32)
+    # Covered by the unique (book, prefix) constraint
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='search_prefixes', db_index=False)
+    score = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.prefix} -> {self.book_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'prefix'], name='unique_book_search_prefix'),
+        ]
+        indexes = [
+            models.Index(fields=['prefix', '-score', 'book'], name='book_search_prefix_rank'),
+        ]
+
+
+class CatalogImport(models.Model):
+    """
+    Progress of an import_catalog run over one source file.
+    
+    Saved in the transaction of every batch, so the offset always matches
+    the books that were committed; a resumed import starts reading there.
+    The fingerprint (see api.catalog.file_fingerprint) tells whether the
+    file is still the one the offset belongs to.
+    """
+    source = models.CharField(max_length=1024, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    # Byte offset just past the last imported row
+    offset = models.BigIntegerField(default=0)
+    books = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} at byte {self.offset}"
+
+
+# Keep the autocomplete index in step with single saves. Bulk writes
+# (bulk_create/bulk_update) send no signals and call index_books themselves.
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'title', 'author'} & set(update_fields)):
+        return
+    from .search import index_books
+    index_books([instance])
+
+
+@receiver(post_save, sender=Author)
+def index_renamed_author(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created or (update_fields is not None and 'name' not in update_fields):
+        return
+    from .search import index_author_books
+    index_author_books(instance)
@@ -0,0 +1,200 @@
+"""
+Pagination for the API list views.
+
+ListPagination is the project's DEFAULT_PAGINATION_CLASS. It has two modes:
+
+    page numbers (default)   ?page=3&page_size=50
+    cursor                   ?pagination=cursor, then follow the next/previous links
+
+Page-number mode reports a count without running COUNT(*) over large
+filtered sets (set PAGINATION_ESTIMATED_COUNT = False to always count):
+
+    - PostgreSQL: the planner's row estimate for the filtered query (EXPLAIN),
+      replaced by an exact COUNT(*) when the estimate is small
+    - other databases: an exact COUNT(*) cached for PAGINATION_COUNT_CACHE_TIMEOUT
+      seconds per distinct query; a count served from the cache may be
+      stale and is reported as an estimate
+
+Whether the next page exists is always decided by fetching one extra row, so
+next/previous links are exact even when the count is estimated. Cursor mode
+never counts and its cost does not grow with the page number.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+PAGINATION_ESTIMATED_COUNT = getattr(settings, 'PAGINATION_ESTIMATED_COUNT', True)
+# Below this many estimated rows an exact COUNT(*) is cheap enough
+PAGINATION_EXACT_COUNT_THRESHOLD = getattr(settings, 'PAGINATION_EXACT_COUNT_THRESHOLD', 10000)
+PAGINATION_COUNT_CACHE_TIMEOUT = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+
+
+def planner_estimate(queryset):
+    """
+    Return the query planner's estimate of the number of rows of queryset,
+    or None if the database does not provide one.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cached_count(queryset):
+    """
+    Return (count, whether it came from the cache) for queryset.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'pagination-count:' + hashlib.sha1(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is not None:
+        return count, True
+    count = queryset.count()
+    cache.set(key, count, PAGINATION_COUNT_CACHE_TIMEOUT)
+    return count, False
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count may be an estimate; see the module docstring.
+    """
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        if not PAGINATION_ESTIMATED_COUNT:
+            return super().count
+        estimate = planner_estimate(self.object_list)
+        if estimate is None:
+            # Up to PAGINATION_COUNT_CACHE_TIMEOUT seconds old when cached
+            count, self.count_is_estimate = cached_count(self.object_list)
+            return count
+        if estimate < PAGINATION_EXACT_COUNT_THRESHOLD:
+            self.count_is_estimate = False
+            return self.object_list.count()
+        self.count_is_estimate = True
+        return estimate
+
+    def validate_number(self, number):
+        # Only the lower bound: with an estimated count the last page is not known
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise InvalidPage('That page number is not an integer')
+        if number < 1:
+            raise InvalidPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise InvalidPage('That page contains no results')
+        return LookaheadPage(rows[:self.per_page], number, self, has_next=len(rows) > self.per_page)
+
+
+class LookaheadPage(Page):
+    """
+    Page that knows from one extra fetched row whether a next page exists.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class EstimatedCountPageNumberPagination(PageNumberPagination):
+    django_paginator_class = EstimatedCountPaginator
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_estimate'] = self.page.paginator.count_is_estimate
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count_is_estimate'] = {'type': 'boolean'}
+        return schema
+
+
+class OrderedCursorPagination(CursorPagination):
+    """
+    Cursor pagination that keeps the view's ordering, with the primary key
+    appended so the ordering is unique as cursors require.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Used when the view has no OrderingFilter: keep the queryset's ordering
+        self.ordering = tuple(queryset.query.order_by or queryset.model._meta.ordering) or ('id',)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            ordering = (*ordering, '-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+
+class ListPagination(BasePagination):
+    """
+    Page-number pagination with an estimated count, or cursor pagination
+    with ?pagination=cursor.
+    """
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.page_numbers = EstimatedCountPageNumberPagination()
+        self.cursor = OrderedCursorPagination()
+        self.active = self.page_numbers
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.active = self.cursor
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_numbers.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.active.to_html()
+
+    def get_results(self, data):
+        return self.active.get_results(data)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_numbers.get_schema_operation_parameters(view) + [{
+            'name': self.mode_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Set to "cursor" for cursor pagination',
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        }]
+
+    @property
+    def display_page_controls(self):
+        return self.active.display_page_controls
@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+# Rows joined into one chunk of a streaming response
+EXPORT_ROWS_PER_CHUNK = 1000
+
+
+def stream_ndjson(rows):
+    """
+    Yield newline-delimited JSON for an iterable of dicts, in chunks of
+    EXPORT_ROWS_PER_CHUNK rows.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row, cls=DjangoJSONEncoder))
+        if len(chunk) == EXPORT_ROWS_PER_CHUNK:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def stream_csv(rows, fields):
+    """
+    Yield CSV with a header row for an iterable of dicts, in chunks of
+    EXPORT_ROWS_PER_CHUNK rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for ?format=ndjson. Exports stream their rows themselves; this
+    only renders ordinary responses such as errors, as a single JSON line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(stream_ndjson(rows)).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer for ?format=csv. Like NDJSONRenderer, only used for responses
+    that are not streamed exports.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(dict.fromkeys(field for row in rows for field in row))
+        return ''.join(stream_csv(rows, fields)).encode(self.charset)
@@ -0,0 +1,190 @@
+"""
+Autocomplete index for books, used by the books/autocomplete/ endpoint.
+
+SearchFilter's icontains over title and author name scans every book. This
+index instead stores, for every book, each prefix of each word of its title
+and of its author's name (AUTOCOMPLETE_MIN_PREFIX_LENGTH to
+AUTOCOMPLETE_MAX_PREFIX_LENGTH characters, lower-cased, accents removed) as
+a BookSearchPrefix row with a score:
+
+    title starts with the word        3000
+    other word of the title           2000
+    word of the author's name         1000
+    minus the title length (max 999), so shorter titles come first
+
+A lookup is an equality match on the prefix, read in (prefix, -score, book)
+index order and stopped after `limit` rows, so its cost depends on the
+limit and not on the number of books. Further words of a query each add a
+join on the (book, prefix) unique index; the rarest word (by a count capped
+at SELECTIVITY_SAMPLE rows) drives the lookup, so a common word does not
+make the query walk all of its rows looking for a rare one.
+
+index_books() must be called for books written without save() (the bulk
+endpoints and the catalog import do); the post_save receivers in
+api.models cover everything else. rebuild_index() recreates the whole index.
+"""
+import re
+import unicodedata
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Author, Book, BookSearchPrefix
+
+AUTOCOMPLETE_MIN_PREFIX_LENGTH = getattr(settings, 'AUTOCOMPLETE_MIN_PREFIX_LENGTH', 2)
+# Longer query words are truncated, at the risk of matching a longer word
+# that only shares this many characters
+AUTOCOMPLETE_MAX_PREFIX_LENGTH = getattr(settings, 'AUTOCOMPLETE_MAX_PREFIX_LENGTH', 12)
+
+TITLE_START_SCORE = 3000
+TITLE_WORD_SCORE = 2000
+AUTHOR_WORD_SCORE = 1000
+
+# Index rows counted per word to find the rarest word of a query
+SELECTIVITY_SAMPLE = 1000
+
+RANK_INDEX_NAME = 'book_search_prefix_rank'
+
+# Books per DELETE/INSERT round, which keeps IN lists below SQLite's variable limit
+INDEX_BATCH_SIZE = 500
+
+
+def words(text):
+    """
+    Split text into lower-case words without accents.
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r'\w+', text)
+
+
+def word_prefixes(word):
+    longest = min(len(word), AUTOCOMPLETE_MAX_PREFIX_LENGTH)
+    return [word[:length] for length in range(AUTOCOMPLETE_MIN_PREFIX_LENGTH, longest + 1)]
+
+
+def book_prefixes(title, author_name):
+    """
+    Return {prefix: score} for a book; a prefix of several words keeps its best score.
+    """
+    scores = {}
+    length_penalty = min(len(title), 999)
+    scored_words = [(word, TITLE_WORD_SCORE) for word in words(title)]
+    if scored_words:
+        scored_words[0] = (scored_words[0][0], TITLE_START_SCORE)
+    scored_words += [(word, AUTHOR_WORD_SCORE) for word in words(author_name)]
+    for word, score in scored_words:
+        for prefix in word_prefixes(word):
+            scores[prefix] = max(scores.get(prefix, 0), score - length_penalty)
+    return scores
+
+
+def _author_names(books):
+    names, missing = {}, set()
+    for book in books:
+        if Book.author.is_cached(book):
+            names[book.author_id] = book.author.name
+        else:
+            missing.add(book.author_id)
+    missing -= names.keys()
+    if missing:
+        names.update(Author.objects.filter(pk__in=missing).values_list('pk', 'name'))
+    return names
+
+
+def index_books(books, new=False):
+    """
+    Replace the index entries of books (saved Book instances). With new=True
+    the books are known to have no entries yet and nothing is deleted.
+    """
+    books = iter(books)
+    while batch := list(islice(books, INDEX_BATCH_SIZE)):
+        names = _author_names(batch)
+        entries = [
+            BookSearchPrefix(prefix=prefix, book_id=book.pk, score=score)
+            for book in batch
+            for prefix, score in book_prefixes(book.title, names.get(book.author_id, '')).items()
+        ]
+        with transaction.atomic():
+            if not new:
+                BookSearchPrefix.objects.filter(book__in=[book.pk for book in batch]).delete()
+            BookSearchPrefix.objects.bulk_create(entries)
+
+
+def index_author_books(author):
+    """
+    Reindex every book of author, e.g. after a rename.
+    """
+    # The related manager hands author itself to each book, so no author queries
+    index_books(author.books.order_by('pk').iterator(chunk_size=INDEX_BATCH_SIZE))
+
+
+def rebuild_index(batch_size=INDEX_BATCH_SIZE):
+    """
+    Recreate the whole index, yielding the number of books indexed so far
+    after each batch.
+    
+    The (prefix, -score, book) index is dropped while the rows are loaded and
+    built once at the end: inserting prefixes in book order into it would
+    touch a random page of it for nearly every row.
+    """
+    rank_index = next(index for index in BookSearchPrefix._meta.indexes if index.name == RANK_INDEX_NAME)
+    schema_editor = connection.schema_editor()
+    BookSearchPrefix.objects.all().delete()
+    with connection.cursor() as cursor:
+        # Absent if an earlier rebuild was interrupted
+        if RANK_INDEX_NAME in connection.introspection.get_constraints(cursor, BookSearchPrefix._meta.db_table):
+            cursor.execute(str(rank_index.remove_sql(BookSearchPrefix, schema_editor)))
+    try:
+        books = Book.objects.select_related('author').order_by('pk').iterator(chunk_size=batch_size)
+        indexed = 0
+        while batch := list(islice(books, batch_size)):
+            index_books(batch, new=True)
+            indexed += len(batch)
+            yield indexed
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(str(rank_index.create_sql(BookSearchPrefix, schema_editor)))
+
+
+def query_prefixes(query):
+    """
+    Return the distinct prefixes to look up for query, longest first.
+    Words shorter than AUTOCOMPLETE_MIN_PREFIX_LENGTH are ignored.
+    """
+    prefixes = {
+        word[:AUTOCOMPLETE_MAX_PREFIX_LENGTH]
+        for word in words(query)
+        if len(word) >= AUTOCOMPLETE_MIN_PREFIX_LENGTH
+    }
+    # "har" adds nothing to "harry": every book matching the second matches the first
+    prefixes = {
+        prefix for prefix in prefixes
+        if not any(other != prefix and other.startswith(prefix) for other in prefixes)
+    }
+    return sorted(prefixes, key=lambda prefix: (-len(prefix), prefix))
+
+
+def _sampled_count(prefix):
+    return BookSearchPrefix.objects.filter(prefix=prefix)[:SELECTIVITY_SAMPLE].count()
+
+
+def autocomplete(query, limit=10):
+    """
+    Return up to limit books (with their authors) matching every word of
+    query as a word prefix, best score first.
+    """
+    prefixes = query_prefixes(query)
+    if not prefixes:
+        return []
+    if len(prefixes) > 1:
+        # Stable sort: among words with SELECTIVITY_SAMPLE or more rows, the longest leads
+        prefixes.sort(key=_sampled_count)
+    first, *others = prefixes
+    entries = BookSearchPrefix.objects.filter(prefix=first)
+    for prefix in others:
+        entries = entries.filter(book__search_prefixes__prefix=prefix)
+    ids = list(entries.order_by('-score', 'book').values_list('book', flat=True)[:limit])
+    books = Book.objects.select_related('author').in_bulk(ids)
+    return [books[pk] for pk in ids if pk in books]
@@ -1,7 +1,15 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Author, Book
+from .search import index_books
 from datetime import datetime
 
+# Rows written per INSERT/UPDATE statement by the bulk endpoints
+BOOK_BULK_BATCH_SIZE = getattr(settings, 'BOOK_BULK_BATCH_SIZE', 1000)
+# Rows accepted per bulk request; larger imports are sent in several requests
+BOOK_BULK_MAX_ROWS = getattr(settings, 'BOOK_BULK_MAX_ROWS', 10000)
+
 
 class BookSerializer(serializers.ModelSerializer):
     """
@@ -59,6 +67,174 @@ class BookSerializer(serializers.ModelSerializer):
         return value
 
 
+class DeferredPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that only checks the type of the submitted pk.
+    
+    The lookup of the related object is left to the list serializer, which
+    resolves the pks of every row with a single in_bulk() query instead of
+    one query per row.
+    """
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BookListSerializer(serializers.ListSerializer):
+    """
+    List serializer behind the bulk Book endpoints.
+    
+    Validates every row in one pass and collects the errors of all rows, in
+    the same order as the submitted list (an empty dict for a valid row).
+    Authors are resolved for all rows with one in_bulk() query, and so are
+    the books being updated when the serializer is given an instance queryset.
+    Writes use bulk_create/bulk_update in batches of BOOK_BULK_BATCH_SIZE,
+    followed by api.search.index_books() as no save signals are sent;
+    the caller wraps save() in a transaction.
+    
+    Example error response for the second of three rows:
+        [
+            {},
+            {"publication_year": ["Publication year cannot be in the future. ..."]},
+            {}
+        ]
+    """
+    
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', BOOK_BULK_MAX_ROWS)
+        super().__init__(*args, **kwargs)
+        self.books = {}
+    
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({
+                'non_field_errors': ['Expected a list of books but got "%s".' % type(data).__name__]
+            })
+        if not data:
+            raise serializers.ValidationError({'non_field_errors': ['This list may not be empty.']})
+        if len(data) > self.max_length:
+            raise serializers.ValidationError({
+                'non_field_errors': [f'Ensure this list has no more than {self.max_length} books.']
+            })
+        
+        rows, errors = [], []
+        for item in data:
+            try:
+                rows.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                rows.append(None)
+                errors.append(exc.detail)
+        
+        if self.instance is not None:
+            self._resolve_books(data, rows, errors)
+        self._resolve_authors(rows, errors)
+        
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+    
+    def _resolve_books(self, data, rows, errors):
+        # Rows to update are identified by their id, which the child treats as read-only
+        ids = [item.get('id') if isinstance(item, dict) else None for item in data]
+        valid_ids = [pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)]
+        self.books = self.instance.in_bulk(valid_ids)
+        seen = set()
+        for index, pk in enumerate(ids):
+            if rows[index] is None:
+                continue
+            if pk is None:
+                errors[index] = {'id': ['This field is required.']}
+            elif pk not in self.books:
+                errors[index] = {'id': [f'Invalid pk "{pk}" - object does not exist.']}
+            elif pk in seen:
+                errors[index] = {'id': [f'Book {pk} appears more than once.']}
+            else:
+                seen.add(pk)
+                rows[index]['id'] = pk
+    
+    def _resolve_authors(self, rows, errors):
+        author_ids = {row['author'] for row in rows if row is not None and 'author' in row}
+        authors = Author.objects.in_bulk(author_ids)
+        for index, row in enumerate(rows):
+            if row is None or 'author' not in row:
+                continue
+            author = authors.get(row['author'])
+            if author is None:
+                # Keep an error _resolve_books() reported for the same row
+                errors[index] = {**errors[index], 'author': [f'Invalid pk "{row["author"]}" - object does not exist.']}
+            else:
+                row['author'] = author
+    
+    def create(self, validated_data):
+        books = [Book(**row) for row in validated_data]
+        books = Book.objects.bulk_create(books, batch_size=BOOK_BULK_BATCH_SIZE)
+        index_books(books, new=True)
+        return books
+    
+    def update(self, instance, validated_data):
+        books, fields = [], set()
+        for row in validated_data:
+            book = self.books[row.pop('id')]
+            for field, value in row.items():
+                setattr(book, field, value)
+                fields.add(field)
+            books.append(book)
+        if fields:
+            # bulk_update() does not apply auto_now
+            now = timezone.now()
+            for book in books:
+                book.updated_at = now
+            fields.add('updated_at')
+            Book.objects.bulk_update(books, sorted(fields), batch_size=BOOK_BULK_BATCH_SIZE)
+        if fields & {'title', 'author'}:
+            index_books(books)
+        return books
+
+
+class BookBulkSerializer(BookSerializer):
+    """
+    BookSerializer for the bulk endpoints: use with many=True.
+    
+    Identical validation to BookSerializer (including
+    validate_publication_year), except that the author is looked up by
+    BookListSerializer for all rows at once.
+    """
+    
+    author = DeferredPrimaryKeyRelatedField(queryset=Author.objects.all())
+    
+    class Meta(BookSerializer.Meta):
+        list_serializer_class = BookListSerializer
+
+
+class BookBulkDeleteSerializer(serializers.Serializer):
+    """
+    Request body of a bulk delete: {"ids": [1, 2, 3]}.
+    """
+    
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BOOK_BULK_MAX_ROWS,
+    )
+
+
+class BookAutocompleteSerializer(BookSerializer):
+    """
+    BookSerializer plus the author's name, for autocomplete suggestions.
+    """
+    
+    author_name = serializers.CharField(source='author.name', read_only=True)
+    
+    class Meta(BookSerializer.Meta):
+        fields = [*BookSerializer.Meta.fields, 'author_name']
+
+
 class AuthorSerializer(serializers.ModelSerializer):
     """
     Serializer for the Author model with nested Book serialization.
@@ -70,6 +246,8 @@ class AuthorSerializer(serializers.ModelSerializer):
         id (int): Auto-generated primary key (read-only).
         name (str): The author's full name.
         books (list): Nested serialization of all books written by this author.
+        book_count (int): Number of books by this author, even when the
+            view limits the nested books.
     
     Nested Relationship Handling:
         The 'books' field is a nested serializer that dynamically serializes all
@@ -93,6 +271,7 @@ class AuthorSerializer(serializers.ModelSerializer):
         {
             "id": 1,
             "name": "J.K. Rowling",
+            "book_count": 2,
             "books": [
                 {
                     "id": 1,
@@ -115,9 +294,17 @@ class AuthorSerializer(serializers.ModelSerializer):
     """
     
     books = BookSerializer(many=True, read_only=True)
+    book_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Author
-        fields = ['id', 'name', 'books']
-
----
+        fields = ['id', 'name', 'book_count', 'books']
+    
+    def get_book_count(self, author):
+        """
+        Use the book_count annotation of the author views, or count the books.
+        """
+        book_count = getattr(author, 'book_count', None)
+        if book_count is None:
+            book_count = author.books.count()
+        return book_count
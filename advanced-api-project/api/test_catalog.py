@@ -0,0 +1,157 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from . import catalog
+from .models import Author, Book, CatalogImport
+
+
+class ImportCatalogCommandTestCase(TestCase):
+    """
+    Test suite for the import_catalog management command.
+    """
+    
+    def setUp(self):
+        """Create a temporary directory for the source files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        Author.objects.create(name='George Orwell')
+    
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+    
+    def run_import(self, *args):
+        call_command('import_catalog', *args, stdout=StringIO(), stderr=StringIO())
+    
+    def test_import_csv_dedupes_authors(self):
+        """
+        Test importing a CSV file with repeated and existing authors.
+        
+        Expected:
+            - One book per valid row, invalid rows skipped
+            - Existing authors reused, new authors created once
+            - Quoted titles spanning lines are kept intact
+        """
+        path = self.write('books.csv', (
+            'title,publication_year,author\n'
+            '1984,1949,George Orwell\n'
+            'Animal Farm,1945,George Orwell\n'
+            '"Two\nLines",2001,New Author\n'
+            'Future Book,9999,New Author\n'
+            'Another,2002,New Author\n'
+        ))
+        
+        self.run_import(path, '--batch-size', '2')
+        
+        self.assertEqual(Book.objects.count(), 4)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Author.objects.get(name='George Orwell').books.count(), 2)
+        self.assertTrue(Book.objects.filter(title='Two\nLines').exists())
+    
+    def test_resume_from_checkpoint(self):
+        """
+        Test that a second run continues after the checkpointed offset.
+        
+        Expected:
+            - Rows before the checkpoint are not imported again
+            - Rerunning a finished import adds nothing
+        """
+        lines = [json.dumps({'title': f'Book {i}', 'publication_year': 2000, 'author': 'Author'}) for i in range(5)]
+        path = self.write('books.ndjson', '\n'.join(lines) + '\n')
+        # As if an earlier run had committed the first two rows and was interrupted
+        CatalogImport.objects.create(
+            source=path, fingerprint=catalog.file_fingerprint(path),
+            offset=len(lines[0]) + len(lines[1]) + 2, books=2,
+        )
+        
+        self.run_import(path)
+        self.run_import(path)
+        
+        self.assertEqual(
+            sorted(Book.objects.values_list('title', flat=True)),
+            ['Book 2', 'Book 3', 'Book 4'],
+        )
+        self.assertEqual(CatalogImport.objects.get(source=path).books, 5)
+    
+    def test_failed_batch_leaves_checkpoint_at_last_commit(self):
+        """
+        Test an import that fails in the middle of a batch.
+        
+        Expected:
+            - The failed batch's books and checkpoint are both rolled back
+            - Running the import again creates every book exactly once
+        """
+        lines = [json.dumps({'title': f'Book {i}', 'publication_year': 2000, 'author': 'Author'}) for i in range(5)]
+        path = self.write('books.ndjson', '\n'.join(lines) + '\n')
+        index_books = catalog.index_books
+        calls = 0
+        
+        def fail_second_batch(books, new=False):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise RuntimeError('interrupted')
+            index_books(books, new=new)
+        
+        with mock.patch.object(catalog, 'index_books', fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, '--batch-size', '2')
+        
+        checkpoint = CatalogImport.objects.get(source=path)
+        self.assertEqual((checkpoint.offset, checkpoint.books), (len(lines[0]) + len(lines[1]) + 2, 2))
+        self.assertEqual(Book.objects.count(), 2)
+        
+        self.run_import(path, '--batch-size', '2')
+        
+        self.assertEqual(
+            sorted(Book.objects.values_list('title', flat=True)),
+            [f'Book {i}' for i in range(5)],
+        )
+    
+    def test_changed_file_is_not_resumed(self):
+        """
+        Test importing a file that was rewritten since the last run.
+        
+        Expected:
+            - The command refuses to resume at the old offset
+            - --restart imports the new content from the first row
+        """
+        path = self.write('books.csv', 'title,publication_year,author\n1984,1949,George Orwell\n')
+        self.run_import(path)
+        self.write('books.csv', 'title,publication_year,author\nEmma,1815,Jane Austen\nPersuasion,1817,Jane Austen\n')
+        # Same modification time as the first file: the size alone tells them apart
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, int(CatalogImport.objects.get().fingerprint.split(':')[1])))
+        
+        with self.assertRaisesMessage(CommandError, 'has changed since it was imported'):
+            self.run_import(path)
+        self.run_import(path, '--restart')
+        
+        self.assertEqual(
+            sorted(Book.objects.values_list('title', flat=True)),
+            ['1984', 'Emma', 'Persuasion'],
+        )
+        self.assertEqual(CatalogImport.objects.get(source=path).books, 2)
+    
+    def test_restart_discards_checkpoint(self):
+        """
+        Test --restart on a finished import.
+        
+        Expected:
+            - The file is imported again from the first row
+        """
+        path = self.write('books.csv', 'title,publication_year,author\n1984,1949,George Orwell\n')
+        
+        self.run_import(path)
+        self.run_import(path, '--restart')
+        
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(CatalogImport.objects.get(source=path).books, 1)
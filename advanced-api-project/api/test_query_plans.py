@@ -0,0 +1,112 @@
+import re
+from itertools import combinations
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from .models import Author, Book
+from .views import BookListView
+
+# Query parameters of BookListView checked by the harness. ?search= is left
+# out on purpose: icontains cannot use an index (see books/autocomplete/).
+FILTERS = ['title', 'author', 'publication_year']
+ORDERINGS = [None, 'title', '-title', 'publication_year', '-publication_year']
+
+# Rows fetched for one page: page size plus the look-ahead row
+PAGE_ROWS = 21
+
+
+def full_scans(plan, table, filtered, sort_allowed=False):
+    """
+    Return the lines of an EXPLAIN output that read every row of table or,
+    unless sort_allowed, sort every matching row.
+
+    Reading the whole table in index order is fine without a filter, as the
+    LIMIT stops it after one page; with a filter it means no index matched.
+    A partial sort ("RIGHT PART OF ORDER BY", "Incremental Sort") only
+    orders the rows that tie on the indexed columns and is allowed.
+    """
+    problems = []
+    for line in plan.splitlines():
+        if connection.vendor == 'postgresql':
+            scan = re.search(rf'Seq Scan on {table}\b', line)
+            sort = re.match(r'\s*(->\s*)?Sort\b', line)
+        else:
+            scan = re.search(rf'\bSCAN {table}\b', line) and (filtered or 'USING' not in line)
+            sort = 'USE TEMP B-TREE FOR ORDER BY' in line
+        if scan or (sort and not sort_allowed):
+            problems.append(line.strip())
+    return problems
+
+
+class BookListQueryPlanTestCase(TestCase):
+    """
+    Run EXPLAIN on the query of every filter/ordering combination of the
+    book list, in page-number and cursor mode, and fail on full scans.
+    
+    The seeded books spread over many authors and years, so that the
+    planner prefers an index wherever one applies.
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        authors = Author.objects.bulk_create(Author(name=f'Author {i}') for i in range(200))
+        Book.objects.bulk_create(
+            Book(title=f'Book {i}', publication_year=1900 + i % 120, author=authors[i % len(authors)])
+            for i in range(5000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.values = {'title': 'Book 42', 'author': authors[7].pk, 'publication_year': 1950}
+    
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # A sequential scan is then chosen only when no index can be used
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+    
+    def list_queryset(self, params):
+        """
+        Build the queryset exactly as BookListView does for these query parameters.
+        """
+        view = BookListView()
+        view.request = view.initialize_request(APIRequestFactory().get('/api/books/', params))
+        view.format_kwarg = None
+        view.args, view.kwargs = (), {}
+        return view.filter_queryset(view.get_queryset())
+    
+    def combinations(self):
+        for size in range(len(FILTERS) + 1):
+            for filters in combinations(FILTERS, size):
+                for ordering in ORDERINGS:
+                    params = {name: self.values[name] for name in filters}
+                    if ordering:
+                        params['ordering'] = ordering
+                    yield params
+    
+    def test_no_full_scans(self):
+        """
+        Test every combination in page-number mode and with the id
+        tie-break of cursor mode.
+        
+        Expected:
+            - No plan reads the whole book table or sorts all matching rows
+        """
+        table = Book._meta.db_table
+        failures = []
+        for params in self.combinations():
+            queryset = self.list_queryset(params)
+            ordering = queryset.query.order_by or Book._meta.ordering
+            cursor_ordering = (*ordering, '-id' if ordering[-1].startswith('-') else 'id')
+            filtered = any(name in params for name in FILTERS)
+            # An exact title matches a handful of books, which are cheap to sort
+            sort_allowed = 'title' in params
+            for mode, query in (
+                ('page', queryset[:PAGE_ROWS]),
+                ('cursor', queryset.order_by(*cursor_ordering)[:PAGE_ROWS]),
+            ):
+                problems = full_scans(query.explain(), table, filtered, sort_allowed)
+                if problems:
+                    failures.append(f'{mode} {params}: {"; ".join(problems)}')
+        self.assertFalse(failures, 'Full scans:\n' + '\n'.join(failures))
@@ -1,8 +1,19 @@
+import csv
+import io
+import json
+from unittest import mock
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from .models import Author, Book
+from .throttling import TokenBucketThrottle
 from datetime import datetime
 
 
@@ -69,7 +80,7 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data['results']), 3)
     
     def test_list_books_authenticated(self):
         """
@@ -83,7 +94,7 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data['results']), 3)
     
     def test_retrieve_book_detail(self):
         """
@@ -248,8 +259,8 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'title': 'Harry Potter'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Harry Potter')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Harry Potter')
     
     def test_filter_books_by_author(self):
         """
@@ -262,7 +273,7 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'author': self.author2.id})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
     
     def test_filter_books_by_publication_year(self):
         """
@@ -275,8 +286,8 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'publication_year': 1949})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], '1984')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], '1984')
     
     def test_search_books_by_title(self):
         """
@@ -289,8 +300,8 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'search': 'Harry'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Harry Potter')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Harry Potter')
     
     def test_search_books_by_author_name(self):
         """
@@ -303,7 +314,7 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'search': 'Orwell'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
     
     def test_order_books_by_title_ascending(self):
         """
@@ -316,7 +327,7 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'ordering': 'title'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        titles = [book['title'] for book in response.data]
+        titles = [book['title'] for book in response.data['results']]
         self.assertEqual(titles, ['1984', 'Animal Farm', 'Harry Potter'])
     
     def test_order_books_by_title_descending(self):
@@ -330,7 +341,7 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'ordering': '-title'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        titles = [book['title'] for book in response.data]
+        titles = [book['title'] for book in response.data['results']]
         self.assertEqual(titles, ['Harry Potter', 'Animal Farm', '1984'])
     
     def test_order_books_by_publication_year(self):
@@ -344,7 +355,7 @@ class BookAPITestCase(APITestCase):
         response = self.client.get(self.list_url, {'ordering': 'publication_year'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        years = [book['publication_year'] for book in response.data]
+        years = [book['publication_year'] for book in response.data['results']]
         self.assertEqual(years, [1945, 1949, 1997])
     
     def test_combined_filter_search_order(self):
@@ -364,8 +375,8 @@ class BookAPITestCase(APITestCase):
         )
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        years = [book['publication_year'] for book in response.data]
+        self.assertEqual(len(response.data['results']), 2)
+        years = [book['publication_year'] for book in response.data['results']]
         self.assertEqual(years, [1949, 1945])
     
     def test_create_book_with_future_year(self):
@@ -483,3 +494,611 @@ class AuthorAPITestCase(APITestCase):
         self.assertEqual(self.author.books.count(), 2)
         self.assertIn(self.book1, self.author.books.all())
         self.assertIn(self.book2, self.author.books.all())
+
+
+class BookBulkAPITestCase(APITestCase):
+    """
+    Test suite for the bulk create/update/delete endpoint.
+    """
+    
+    def setUp(self):
+        """Set up a user, two authors and two books."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.author1 = Author.objects.create(name='J.K. Rowling')
+        self.author2 = Author.objects.create(name='George Orwell')
+        self.book1 = Book.objects.create(title='1984', publication_year=1949, author=self.author2)
+        self.book2 = Book.objects.create(title='Animal Farm', publication_year=1945, author=self.author2)
+        self.bulk_url = reverse('book-bulk')
+        self.client.force_authenticate(user=self.user)
+    
+    def test_bulk_create_uses_constant_queries(self):
+        """
+        Test that creating many books validates and writes them in a fixed
+        number of queries.
+        
+        Expected:
+            - Status code: 201 Created
+            - Savepoint, author lookup, insert and savepoint release, plus
+              the batched inserts of the autocomplete index in their own savepoint
+        """
+        data = [
+            {'title': f'Book {i}', 'publication_year': 2000 + i % 20, 'author': self.author1.id}
+            for i in range(200)
+        ]
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.bulk_url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        book_queries = [query for query in queries if 'api_booksearchprefix' not in query['sql']]
+        self.assertEqual(len(book_queries), 6)
+        self.assertLess(len(queries) - len(book_queries), 10)
+        self.assertEqual(len(response.data), 200)
+        self.assertEqual(Book.objects.filter(author=self.author1).count(), 200)
+    
+    def test_bulk_create_reports_errors_per_row(self):
+        """
+        Test that invalid rows are reported by position and nothing is saved.
+        
+        Expected:
+            - Status code: 400 Bad Request
+            - An empty error object for the valid row
+            - No books created
+        """
+        future_year = datetime.now().year + 1
+        data = [
+            {'title': 'Valid', 'publication_year': 2020, 'author': self.author1.id},
+            {'title': 'Future', 'publication_year': future_year, 'author': self.author1.id},
+            {'title': 'No Author', 'publication_year': 2020, 'author': 9999},
+        ]
+        
+        response = self.client.post(self.bulk_url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('publication_year', response.data[1])
+        self.assertIn('author', response.data[2])
+        self.assertEqual(Book.objects.count(), 2)
+    
+    def test_bulk_partial_update(self):
+        """
+        Test updating several books with PATCH.
+        
+        Expected:
+            - Status code: 200 OK
+            - Only the submitted fields change
+            - Unknown ids are reported for their row, along with unknown authors
+        """
+        data = [
+            {'id': self.book1.id, 'title': 'Nineteen Eighty-Four'},
+            {'id': self.book2.id, 'author': self.author1.id},
+        ]
+        
+        response = self.client.patch(self.bulk_url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.book1.refresh_from_db()
+        self.book2.refresh_from_db()
+        self.assertEqual(self.book1.title, 'Nineteen Eighty-Four')
+        self.assertEqual(self.book1.publication_year, 1949)
+        self.assertEqual(self.book2.author, self.author1)
+        
+        response = self.client.patch(self.bulk_url, [{'id': 9999, 'title': 'Missing'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', response.data[0])
+        
+        response = self.client.patch(self.bulk_url, [{'id': 9999, 'author': 9999}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data[0]), {'id', 'author'})
+    
+    def test_bulk_delete(self):
+        """
+        Test deleting several books by id.
+        
+        Expected:
+            - Status code: 200 OK
+            - Existing books deleted, missing ids listed
+        """
+        data = {'ids': [self.book1.id, self.book2.id, 9999]}
+        
+        response = self.client.delete(self.bulk_url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'deleted': 2, 'not_found': [9999]})
+        self.assertEqual(Book.objects.count(), 0)
+    
+    def test_bulk_requires_authentication(self):
+        """
+        Test that unauthenticated users cannot use the bulk endpoint.
+        
+        Expected:
+            - Status code: 401 Unauthorized
+        """
+        self.client.force_authenticate(user=None)
+        
+        response = self.client.post(self.bulk_url, [], format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BookExportAPITestCase(APITestCase):
+    """
+    Test suite for the streaming ndjson/csv export of the book list.
+    """
+    
+    def setUp(self):
+        """Set up two authors and three books."""
+        self.author1 = Author.objects.create(name='J.K. Rowling')
+        self.author2 = Author.objects.create(name='George Orwell')
+        self.book1 = Book.objects.create(title='Harry Potter', publication_year=1997, author=self.author1)
+        self.book2 = Book.objects.create(title='1984', publication_year=1949, author=self.author2)
+        self.book3 = Book.objects.create(title='Animal Farm', publication_year=1945, author=self.author2)
+        self.list_url = reverse('book-list')
+    
+    def test_export_ndjson_honours_filters_and_ordering(self):
+        """
+        Test streaming NDJSON with a filter and an ordering.
+        
+        Expected:
+            - A streaming response with one JSON object per line
+            - Only the filtered books, in the requested order
+        """
+        response = self.client.get(self.list_url, {
+            'format': 'ndjson', 'author': self.author2.id, 'ordering': 'publication_year',
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'id': self.book3.id, 'title': 'Animal Farm', 'publication_year': 1945, 'author': self.author2.id},
+            {'id': self.book2.id, 'title': '1984', 'publication_year': 1949, 'author': self.author2.id},
+        ])
+    
+    def test_export_csv_honours_search(self):
+        """
+        Test streaming CSV with a search on the author name.
+        
+        Expected:
+            - A CSV header row followed by the matching books
+        """
+        response = self.client.get(self.list_url, {'format': 'csv', 'search': 'rowling'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows, [
+            ['id', 'title', 'publication_year', 'author'],
+            [str(self.book1.id), 'Harry Potter', '1997', str(self.author1.id)],
+        ])
+
+
+class BookPaginationAPITestCase(APITestCase):
+    """
+    Test suite for page-number and cursor pagination of the book list.
+    """
+    
+    def setUp(self):
+        """Set up one author with 25 books and an empty count cache."""
+        cache.clear()
+        self.author = Author.objects.create(name='Test Author')
+        Book.objects.bulk_create(
+            Book(title=f'Book {i:02}', publication_year=2000, author=self.author) for i in range(25)
+        )
+        self.list_url = reverse('book-list')
+    
+    def test_page_number_pagination(self):
+        """
+        Test the default page-number mode.
+        
+        Expected:
+            - 20 results on the first page, 5 on the second
+            - An exact count and next/previous links
+        """
+        response = self.client.get(self.list_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(response.data['count_is_estimate'])
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+        
+        response = self.client.get(response.data['next'])
+        
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+    
+    def test_count_is_cached(self):
+        """
+        Test that a repeated list request does not count the books again.
+        
+        Expected:
+            - Only the page itself is queried the second time
+            - The cached count, which may be stale, is flagged as an estimate
+        """
+        response = self.client.get(self.list_url, {'search': 'Book'})
+        
+        self.assertFalse(response.data['count_is_estimate'])
+        
+        Book.objects.create(title='Book 25', publication_year=2000, author=self.author)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, {'search': 'Book'})
+        
+        self.assertEqual(response.data['count'], 25)
+        self.assertTrue(response.data['count_is_estimate'])
+    
+    def test_cursor_pagination(self):
+        """
+        Test cursor mode with an ordering.
+        
+        Expected:
+            - No count in the response
+            - Following the next links returns every book once, in order
+        """
+        titles = []
+        response = self.client.get(self.list_url, {'pagination': 'cursor', 'ordering': '-title', 'page_size': 10})
+        
+        self.assertNotIn('count', response.data)
+        while True:
+            titles += [book['title'] for book in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        
+        self.assertEqual(titles, [f'Book {i:02}' for i in reversed(range(25))])
+
+
+class AuthorListAPITestCase(APITestCase):
+    """
+    Test suite for the author list/detail endpoints with nested books.
+    """
+    
+    def setUp(self):
+        """Set up three authors with 1, 2 and 3 books."""
+        cache.clear()
+        self.authors = []
+        for number in range(1, 4):
+            author = Author.objects.create(name=f'Author {number}')
+            for i in range(number):
+                Book.objects.create(title=f'Book {number}.{i}', publication_year=2000 + i, author=author)
+            self.authors.append(author)
+        self.list_url = reverse('author-list')
+    
+    def test_list_authors_with_books(self):
+        """
+        Test the author list with nested books and book counts.
+        
+        Expected:
+            - Status code: 200 OK
+            - Each author has book_count and all of their books
+        """
+        response = self.client.get(self.list_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        results = response.data['results']
+        self.assertEqual([author['book_count'] for author in results], [1, 2, 3])
+        self.assertEqual(
+            [book['title'] for book in results[2]['books']],
+            ['Book 3.0', 'Book 3.1', 'Book 3.2'],
+        )
+    
+    def test_list_authors_uses_constant_queries(self):
+        """
+        Test that the number of queries does not grow with the number of
+        authors on the page.
+        
+        Expected:
+            - Count, authors and books: 3 queries for 3 authors and for 13
+        """
+        with self.assertNumQueries(3):
+            self.client.get(self.list_url)
+        
+        for number in range(10):
+            author = Author.objects.create(name=f'Extra {number}')
+            Book.objects.create(title=f'Extra book {number}', publication_year=2020, author=author)
+        cache.clear()
+        
+        with self.assertNumQueries(3):
+            response = self.client.get(self.list_url)
+        
+        self.assertEqual(len(response.data['results']), 13)
+    
+    def test_books_limit(self):
+        """
+        Test limiting the nested books per author.
+        
+        Expected:
+            - At most books_limit books per author, the first by title
+            - book_count still counts every book
+            - 400 Bad Request for an invalid limit
+        """
+        with self.assertNumQueries(3):
+            response = self.client.get(self.list_url, {'books_limit': 2, 'ordering': '-book_count'})
+        
+        author = response.data['results'][0]
+        self.assertEqual(author['book_count'], 3)
+        self.assertEqual([book['title'] for book in author['books']], ['Book 3.0', 'Book 3.1'])
+        self.assertEqual([len(author['books']) for author in response.data['results']], [2, 2, 1])
+        
+        response = self.client.get(self.list_url, {'books_limit': 0})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_author_detail(self):
+        """
+        Test retrieving one author with their books.
+        
+        Expected:
+            - Status code: 200 OK
+            - The author's book_count and books
+        """
+        detail_url = reverse('author-detail', kwargs={'pk': self.authors[1].pk})
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(detail_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['book_count'], 2)
+        self.assertEqual(len(response.data['books']), 2)
+
+
+class BookAutocompleteAPITestCase(APITestCase):
+    """
+    Test suite for the book autocomplete endpoint and its index.
+    """
+    
+    def setUp(self):
+        """Set up two authors and four books."""
+        self.author1 = Author.objects.create(name='J.K. Rowling')
+        self.author2 = Author.objects.create(name='George Orwell')
+        self.book1 = Book.objects.create(title='Harry Potter', publication_year=1997, author=self.author1)
+        self.book2 = Book.objects.create(title='The Tales of Beedle the Bard', publication_year=2008, author=self.author1)
+        self.book3 = Book.objects.create(title='Animal Farm', publication_year=1945, author=self.author2)
+        self.book4 = Book.objects.create(title='Down and Out in Paris', publication_year=1933, author=self.author2)
+        self.url = reverse('book-autocomplete')
+    
+    def titles(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book['title'] for book in response.data]
+    
+    def test_prefix_matches_title_and_author(self):
+        """
+        Test matching word prefixes of titles and author names.
+        
+        Expected:
+            - Title matches rank above author-name matches
+            - Every word of the query must match, in any order
+            - Case and accents are ignored
+        """
+        self.assertEqual(self.titles('ha'), ['Harry Potter'])
+        self.assertEqual(self.titles('po har'), ['Harry Potter'])
+        self.assertEqual(self.titles('ORW'), ['Animal Farm', 'Down and Out in Paris'])
+        self.assertEqual(self.titles('páris ou'), ['Down and Out in Paris'])
+        self.assertEqual(self.titles('far rowling'), [])
+        self.assertEqual(self.titles('a'), [])
+    
+    def test_response_fields_and_limit(self):
+        """
+        Test the response fields and the limit parameter.
+        
+        Expected:
+            - id, title, publication_year, author and author_name
+            - At most limit results, in two queries
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': 'rowling', 'limit': 1})
+        
+        self.assertEqual(response.data, [{
+            'id': self.book1.id, 'title': 'Harry Potter', 'publication_year': 1997,
+            'author': self.author1.id, 'author_name': 'J.K. Rowling',
+        }])
+    
+    def test_index_follows_changes(self):
+        """
+        Test that saves, author renames, bulk writes and deletes update the index.
+        
+        Expected:
+            - Only current titles and names are found
+        """
+        self.book1.title = 'Harry Potter and the Goblet of Fire'
+        self.book1.save()
+        self.author2.name = 'Eric Blair'
+        self.author2.save()
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=user)
+        self.client.post(reverse('book-bulk'), [
+            {'title': 'Nineteen Eighty-Four', 'publication_year': 1949, 'author': self.author2.id},
+        ], format='json')
+        self.client.patch(reverse('book-bulk'), [{'id': self.book3.id, 'title': 'Burmese Days'}], format='json')
+        self.book4.delete()
+        
+        self.assertEqual(self.titles('goblet'), ['Harry Potter and the Goblet of Fire'])
+        self.assertEqual(self.titles('orwell'), [])
+        self.assertEqual(self.titles('blair'), ['Burmese Days', 'Nineteen Eighty-Four'])
+        self.assertEqual(self.titles('animal'), [])
+        self.assertEqual(self.titles('paris'), [])
+    
+    def test_rebuild_search_index(self):
+        """
+        Test rebuilding the index from scratch.
+        
+        Expected:
+            - Books written without save() are found afterwards
+        """
+        Book.objects.filter(pk=self.book3.pk).update(title='Burmese Days')
+        
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        
+        self.assertEqual(self.titles('burm'), ['Burmese Days'])
+        self.assertEqual(self.titles('ha'), ['Harry Potter'])
+
+
+class BookConditionalGetAPITestCase(APITestCase):
+    """
+    Test suite for ETag/Last-Modified handling of the book endpoints.
+    """
+    
+    def setUp(self):
+        """Set up two authors and three books."""
+        cache.clear()
+        self.author1 = Author.objects.create(name='J.K. Rowling')
+        self.author2 = Author.objects.create(name='George Orwell')
+        self.book1 = Book.objects.create(title='Harry Potter', publication_year=1997, author=self.author1)
+        self.book2 = Book.objects.create(title='1984', publication_year=1949, author=self.author2)
+        self.book3 = Book.objects.create(title='Animal Farm', publication_year=1945, author=self.author2)
+        self.list_url = reverse('book-list')
+        self.detail_url = reverse('book-detail', kwargs={'pk': self.book1.pk})
+    
+    def test_detail_not_modified(self):
+        """
+        Test conditional GETs of a single book.
+        
+        Expected:
+            - ETag and Last-Modified on the response
+            - 304 for a matching If-None-Match or a current If-Modified-Since
+            - 200 with a new ETag once the book changes
+        """
+        response = self.client.get(self.detail_url)
+        etag = response['ETag']
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.book1.title = 'Harry Potter and the Goblet of Fire'
+        self.book1.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_list_etag_follows_matching_books(self):
+        """
+        Test conditional GETs of a filtered list.
+        
+        Expected:
+            - 304 while the matching books are unchanged, even if other books change
+            - A new ETag after a matching book is updated, created or deleted
+        """
+        params = {'author': self.author2.id}
+        etag = self.client.get(self.list_url, params)['ETag']
+        
+        response = self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.book1.title = 'Harry Potter and the Goblet of Fire'
+        self.book1.save()
+        Book.objects.create(title='The Casual Vacancy', publication_year=2012, author=self.author1)
+        
+        response = self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=user)
+        bulk_url = reverse('book-bulk')
+        etags = [etag]
+        
+        self.client.patch(bulk_url, [{'id': self.book3.id, 'publication_year': 1946}], format='json')
+        etags.append(self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etags[-1])['ETag'])
+        Book.objects.create(title='Burmese Days', publication_year=1934, author=self.author2)
+        etags.append(self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etags[-1])['ETag'])
+        self.book2.delete()
+        etags.append(self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etags[-1])['ETag'])
+        
+        self.assertEqual(len(set(etags)), 4)
+    
+    def test_export_not_modified(self):
+        """
+        Test a conditional GET of an export.
+        
+        Expected:
+            - A different ETag from the JSON list
+            - 304 for a matching If-None-Match
+        """
+        etag = self.client.get(self.list_url, {'format': 'csv'})['ETag']
+        
+        self.assertNotEqual(etag, self.client.get(self.list_url)['ETag'])
+        
+        response = self.client.get(self.list_url, {'format': 'csv'}, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'books': '2/min', 'books.ip': '3/min'},
+})
+class BookCreateThrottleAPITestCase(APITestCase):
+    """
+    Test suite for the token-bucket rate limits of the create endpoint.
+    """
+    
+    def setUp(self):
+        """Set up two users, an author and a fixed clock."""
+        cache.clear()
+        self.author = Author.objects.create(name='J.K. Rowling')
+        self.user1 = User.objects.create_user(username='testuser1', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.url = reverse('book-create')
+        self.now = 1_700_000_000.0
+        timer = mock.patch.object(TokenBucketThrottle, 'timer', mock.Mock(side_effect=lambda: self.now))
+        timer.start()
+        self.addCleanup(timer.stop)
+    
+    def create(self, user, remote_addr='10.0.0.1'):
+        self.client.force_authenticate(user=user)
+        data = {'title': 'Harry Potter', 'publication_year': 1997, 'author': self.author.id}
+        return self.client.post(self.url, data, format='json', REMOTE_ADDR=remote_addr)
+    
+    def test_user_bucket(self):
+        """
+        Test creating books faster than the per-user rate.
+        
+        Expected:
+            - The first 2 requests succeed, the third gets 429 with Retry-After
+            - Nothing is created by a throttled request
+            - One more request is allowed after 30 seconds
+        """
+        statuses = [self.create(self.user1).status_code for _ in range(2)]
+        response = self.create(self.user1)
+        
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 2)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(response['Retry-After']), 30)
+        self.assertEqual(Book.objects.count(), 2)
+        
+        self.now += 30
+        
+        self.assertEqual(self.create(self.user1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create(self.user1).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_ip_bucket(self):
+        """
+        Test two users creating books from the same IP.
+        
+        Expected:
+            - The IP bucket runs out after 3 requests, whichever user sends them
+            - A request denied by the IP bucket takes no token from the user's
+            - Requests from another IP are unaffected
+        """
+        self.create(self.user1)
+        self.create(self.user1)
+        
+        self.assertEqual(self.create(self.user2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create(self.user2).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.create(self.user2, '10.0.0.2').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create(self.user2, '10.0.0.2').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
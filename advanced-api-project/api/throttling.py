@@ -0,0 +1,147 @@
+"""
+Token-bucket throttling for the book write endpoints.
+
+This is a copy of social_media_api/social_media_api/throttling.py, the
+reference version, without scoped_throttle(). The projects share no
+installable package. Make changes to take_token() and TokenBucketThrottle
+there first and copy them here.
+
+A view opts in with a throttle_scope. Each request then takes a token from
+two buckets, whose rates are read from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+in DRF's "number/period" format:
+
+    '<scope>'       per authenticated user
+    '<scope>.ip'    per client IP
+
+A rate of None turns that bucket off. A bucket holds `number` tokens and
+refills at number/period tokens per second, so a client can burst up to
+`number` requests and then continue at the average rate. A request denied
+by either bucket takes no token from the other.
+
+The client IP is REMOTE_ADDR unless REST_FRAMEWORK['NUM_PROXIES'] says how
+many proxies in front of the app append to X-Forwarded-For. Unlike DRF's
+default, an unset NUM_PROXIES does not trust X-Forwarded-For, which any
+client can send to get a fresh IP bucket.
+
+Each bucket is one integer in the cache backend: the amount ever taken from
+it, in thousandths of a token, counted on the same scale as the amount
+granted since the epoch (int(now * rate * TOKEN)). A request is a single
+atomic cache.incr(); the bucket is full when the counter is at the granted
+total and empty when it is `number` tokens ahead of it. Nothing is read and
+written back, so concurrent requests in other workers cannot overwrite each
+other's tokens as long as the backend's incr is atomic (Redis, Memcached;
+LocMemCache only within one process). With several workers, configure a
+shared cache or each worker keeps its own buckets.
+"""
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# Counter units per token, so that refills are not rounded to whole tokens
+TOKEN = 1000
+
+# Buckets expire this many periods after they are created and then start
+# full again, which can grant one extra burst per expiry
+BUCKET_TIMEOUT_PERIODS = 10
+
+
+def parse_rate(rate):
+    """
+    Return (capacity, period in seconds) for a rate like '30/min', or None.
+    """
+    if rate is None:
+        return None
+    number, period = rate.split('/')
+    return int(number), PERIODS[period[0]]
+
+
+def bucket_key(scope, kind, ident):
+    return f'throttle:{scope}:{kind}:{ident}'
+
+
+def take_token(key, capacity, period, now):
+    """
+    Take a token from the bucket at key. Returns 0 if a token was taken,
+    otherwise the number of seconds until one is available.
+    """
+    rate = capacity * TOKEN / period
+    granted = int(now * rate)
+    try:
+        taken = cache.incr(key, TOKEN)
+    except ValueError:
+        # New or expired bucket: start full, minus this request's token
+        if cache.add(key, granted + TOKEN, period * BUCKET_TIMEOUT_PERIODS):
+            return 0
+        taken = cache.incr(key, TOKEN)
+    if taken < granted + TOKEN:
+        # Idle long enough to be more than full: top out at capacity
+        missing = granted + TOKEN - taken
+        taken = cache.incr(key, missing)
+        if taken - missing >= granted + TOKEN:
+            # A concurrent request topped it out first; undo ours
+            taken = cache.decr(key, missing)
+    if taken <= granted + capacity * TOKEN:
+        return 0
+    # Denied requests do not use up tokens
+    return_token(key)
+    return (taken - capacity * TOKEN) / rate - now
+
+
+def return_token(key):
+    cache.decr(key, TOKEN)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Take a token from the user's and the client IP's bucket of the view's scope.
+    """
+    timer = time.time
+
+    def get_rate(self, name):
+        try:
+            return parse_rate(api_settings.DEFAULT_THROTTLE_RATES[name])
+        except KeyError:
+            raise ImproperlyConfigured(f"No throttle rate set for scope '{name}'")
+
+    def get_ident(self, request):
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return super().get_ident(request)
+
+    def get_buckets(self, request, scope):
+        """
+        Return (key, capacity, period) for each bucket that applies to request.
+        """
+        buckets = []
+        user = request.user
+        if user and user.is_authenticated and (rate := self.get_rate(scope)):
+            buckets.append((bucket_key(scope, 'user', user.pk), *rate))
+        if rate := self.get_rate(f'{scope}.ip'):
+            buckets.append((bucket_key(scope, 'ip', self.get_ident(request)), *rate))
+        return buckets
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        now = self.timer()
+        taken = []
+        for key, capacity, period in self.get_buckets(request, scope):
+            wait = take_token(key, capacity, period, now)
+            if wait:
+                for other in taken:
+                    return_token(other)
+                self.wait_seconds = max(wait, 0)
+                return False
+            taken.append(key)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
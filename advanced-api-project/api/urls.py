@@ -1,17 +1,25 @@
 from django.urls import path
 from .views import (
+AuthorDetailView,
+AuthorListView,
+BookAutocompleteView,
 BookListView,
 BookDetailView,
 BookCreateView,
 BookUpdateView,
-BookDeleteView
+BookDeleteView,
+BookBulkView
 )
 urlpatterns = [
 path('books/', BookListView.as_view(), name='book-list'),
-path('books/int:pk/', BookDetailView.as_view(), name='book-detail'),
+path('books/autocomplete/', BookAutocompleteView.as_view(), name='book-autocomplete'),
+path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
 path('books/create/', BookCreateView.as_view(), name='book-create'),
+path('books/bulk/', BookBulkView.as_view(), name='book-bulk'),
 path('books/update/', BookUpdateView.as_view(), name='book-update-list'),
-path('books/int:pk/update/', BookUpdateView.as_view(), name='book-update'),
+path('books/<int:pk>/update/', BookUpdateView.as_view(), name='book-update'),
 path('books/delete/', BookDeleteView.as_view(), name='book-delete-list'),
-path('books/int:pk/delete/', BookDeleteView.as_view(), name='book-delete'),
+path('books/<int:pk>/delete/', BookDeleteView.as_view(), name='book-delete'),
+path('authors/', AuthorListView.as_view(), name='author-list'),
+path('authors/<int:pk>/', AuthorDetailView.as_view(), name='author-detail'),
 ]
@@ -1,8 +1,22 @@
-from rest_framework import generics
+from django.db import transaction
+from django.db.models import Count, F, Max, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django_filters import rest_framework as filters
-from .models import Book
-from .serializers import BookSerializer
+from .conditional import make_etag, not_modified, set_validators
+from .models import Author, Book
+from .renderers import CSVRenderer, NDJSONRenderer, stream_csv, stream_ndjson
+from .search import autocomplete
+from .serializers import (
+    BOOK_BULK_BATCH_SIZE, AuthorSerializer, BookAutocompleteSerializer, BookBulkDeleteSerializer,
+    BookBulkSerializer, BookSerializer,
+)
 
 
 class BookListView(generics.ListAPIView):
@@ -41,6 +55,21 @@ class BookListView(generics.ListAPIView):
         Example:
             /api/books/?search=python&publication_year=2020&ordering=-title
     
+    Streaming Export:
+        ?format=ndjson or ?format=csv (or an Accept header of
+        application/x-ndjson / text/csv) streams every matching book instead,
+        after the same filtering, searching and ordering. Rows are read with
+        .values() and .iterator(), so memory use does not grow with the
+        number of books.
+        Examples:
+            - /api/books/?format=csv
+            - /api/books/?format=ndjson&author=1&ordering=-publication_year
+    
+    Conditional GET:
+        Every response has an ETag (see api.conditional); a request with a
+        matching If-None-Match gets 304 Not Modified without the books
+        being serialized.
+    
     Returns:
         - List of Book instances matching the query parameters
     """
@@ -48,7 +77,7 @@ class BookListView(generics.ListAPIView):
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
-    filter_backends = [filters.DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.DjangoFilterBackend, SearchFilter, OrderingFilter]
     
     filterset_fields = ['title', 'author', 'publication_year']
     
@@ -57,6 +86,92 @@ class BookListView(generics.ListAPIView):
     ordering_fields = ['title', 'publication_year']
     
     ordering = ['title']
+    
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, CSVRenderer]
+    
+    # Fields of a streamed export, matching BookSerializer (author is the author id)
+    export_fields = ['id', 'title', 'publication_year', 'author']
+    
+    export_chunk_size = 2000
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Return a page of the list, or stream an export for the ndjson/csv
+        formats; 304 Not Modified if the client's ETag still matches.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        export_format = request.accepted_renderer.format
+        if export_format in ('ndjson', 'csv'):
+            state = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+            etag = make_etag(request, state['last_modified'], state['count'])
+            response = not_modified(request, etag) or self.export(queryset, export_format)
+            return set_validators(response, etag)
+        
+        page = self.paginate_queryset(queryset)
+        books = list(queryset) if page is None else page
+        envelope = None
+        if page is not None:
+            envelope = self.paginator.get_paginated_response([]).data
+            del envelope['results']
+            # Whether the count came from the cache does not change the page
+            envelope.pop('count_is_estimate', None)
+        etag = make_etag(request, envelope, [(book.pk, book.updated_at) for book in books])
+        response = not_modified(request, etag)
+        if response is None:
+            data = self.get_serializer(books, many=True).data
+            response = Response(data) if page is None else self.get_paginated_response(data)
+        return set_validators(response, etag)
+    
+    def export(self, queryset, export_format):
+        rows = queryset.values(*self.export_fields).iterator(chunk_size=self.export_chunk_size)
+        if export_format == 'csv':
+            content = stream_csv(rows, self.export_fields)
+        else:
+            content = stream_ndjson(rows)
+        content_type = f'{self.request.accepted_renderer.media_type}; charset=utf-8'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        return response
+
+
+class BookAutocompleteView(generics.ListAPIView):
+    """
+    API view suggesting books as the user types.
+    
+    Endpoint: GET /api/books/autocomplete/?q=<text>
+    
+    Permissions:
+        - Read-only access for all users (authenticated and unauthenticated)
+    
+    Matching:
+        Every word of q must be the start of a word of the book's title or of
+        its author's name, ignoring case and accents. Results come from the
+        index in api.search, ranked by where the words matched, so the
+        response time does not grow with the number of books.
+        Examples:
+            - /api/books/autocomplete/?q=harry pot
+            - /api/books/autocomplete/?q=orwell&limit=5
+    
+    Returns:
+        - Up to limit (default 10, at most 50) books with their author_name,
+          without pagination
+    """
+    serializer_class = BookAutocompleteSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    filter_backends = []
+    pagination_class = None
+    default_limit = 10
+    max_limit = 50
+    
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+    
+    def get_queryset(self):
+        return autocomplete(self.request.query_params.get('q', ''), self.get_limit())
 
 
 class BookDetailView(generics.RetrieveAPIView):
@@ -69,7 +184,10 @@ class BookDetailView(generics.RetrieveAPIView):
         - Read-only access for all users (authenticated and unauthenticated)
     
     Returns:
-        - Single Book instance serialized with BookSerializer
+        - Single Book instance serialized with BookSerializer, with ETag and
+          Last-Modified headers
+        - 304 Not Modified if If-None-Match or If-Modified-Since shows the
+          client's copy is current
         
     Usage:
         GET /books/1/ - Returns book with ID 1
@@ -77,6 +195,14 @@ class BookDetailView(generics.RetrieveAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    
+    def retrieve(self, request, *args, **kwargs):
+        book = self.get_object()
+        etag = make_etag(request, book.updated_at)
+        response = not_modified(request, etag, book.updated_at)
+        if response is None:
+            response = Response(self.get_serializer(book).data)
+        return set_validators(response, etag, book.updated_at)
 
 
 class BookCreateView(generics.CreateAPIView):
@@ -105,6 +231,8 @@ class BookCreateView(generics.CreateAPIView):
         - 201 Created with the newly created book data
         - 400 Bad Request if validation fails
         - 401 Unauthorized if user is not authenticated
+        - 429 Too Many Requests over the 'books' rate (per user) or the
+          'books.ip' rate (per client IP), with a Retry-After header
         
     Usage:
         POST /books/create/
@@ -114,6 +242,7 @@ class BookCreateView(generics.CreateAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'books'
 
     def perform_create(self, serializer):
         """
@@ -211,3 +340,174 @@ class BookDeleteView(generics.DestroyAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+
+
+class BookBulkView(generics.GenericAPIView):
+    """
+    API view to create, update or delete many books in one request.
+    
+    Endpoints:
+        - POST /books/bulk/ - Create books from a list of book objects
+        - PUT /books/bulk/ - Full update of a list of books (each with its "id")
+        - PATCH /books/bulk/ - Partial update of a list of books (each with its "id")
+        - DELETE /books/bulk/ - Delete the books listed in {"ids": [...]}
+    
+    Permissions:
+        - Only authenticated users can change books
+    
+    Request Body (POST):
+        [
+            {"title": "Book One", "publication_year": 2001, "author": 1},
+            {"title": "Book Two", "publication_year": 2002, "author": 2}
+        ]
+    
+    Request Body (PATCH):
+        [
+            {"id": 10, "title": "New Title"},
+            {"id": 11, "publication_year": 1999}
+        ]
+    
+    Validation:
+        - Every row gets the same validation as the single-book endpoints,
+          including validate_publication_year
+        - All rows are validated before anything is written. If any row is
+          invalid nothing is saved and the 400 response lists the errors per
+          row, in request order (an empty object for valid rows)
+        - Authors (and books to update) are looked up with one query for the
+          whole request
+        - At most BOOK_BULK_MAX_ROWS (10000) rows per request
+    
+    Returns:
+        - 201 Created / 200 OK with the created or updated books
+        - 200 OK with {"deleted": n, "not_found": [ids]} for DELETE
+        - 400 Bad Request with per-row errors if validation fails
+        - 401 Unauthorized if user is not authenticated
+    
+    Usage:
+        POST /books/bulk/
+        Headers: Authorization: Token <your-token>
+        Body: JSON list of books
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookBulkSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    def put(self, request, *args, **kwargs):
+        return self.bulk_update(request, partial=False)
+    
+    def patch(self, request, *args, **kwargs):
+        return self.bulk_update(request, partial=True)
+    
+    def bulk_update(self, request, partial):
+        serializer = self.get_serializer(self.get_queryset(), data=request.data, many=True, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+    
+    def delete(self, request, *args, **kwargs):
+        serializer = BookBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        
+        found = set()
+        with transaction.atomic():
+            for start in range(0, len(ids), BOOK_BULK_BATCH_SIZE):
+                batch = self.get_queryset().filter(pk__in=ids[start:start + BOOK_BULK_BATCH_SIZE])
+                existing = list(batch.values_list('pk', flat=True))
+                Book.objects.filter(pk__in=existing).delete()
+                found.update(existing)
+        return Response({
+            'deleted': len(found),
+            'not_found': [pk for pk in ids if pk not in found],
+        })
+
+
+class AuthorQuerysetMixin:
+    """
+    Queryset for the author views: each author annotated with book_count and
+    their books prefetched, so a page of authors costs one query for the
+    authors and one for all of their books.
+    
+    ?books_limit=<n> keeps only the first n books (by title) of each author.
+    The limit is applied in the database with a ROW_NUMBER() window, still
+    in the single books query.
+    """
+    queryset = Author.objects.all()
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    books_limit_query_param = 'books_limit'
+    
+    def get_books_limit(self):
+        value = self.request.query_params.get(self.books_limit_query_param)
+        if value is None:
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError({self.books_limit_query_param: ['Must be a positive integer.']})
+        return limit
+    
+    def get_queryset(self):
+        books = Book.objects.all()
+        limit = self.get_books_limit()
+        if limit is not None:
+            books = books.annotate(
+                position=Window(RowNumber(), partition_by=F('author'), order_by=Book._meta.ordering),
+            ).filter(position__lte=limit)
+        return super().get_queryset().annotate(book_count=Count('books')).prefetch_related(
+            Prefetch('books', queryset=books),
+        )
+
+
+class AuthorListView(AuthorQuerysetMixin, generics.ListAPIView):
+    """
+    API view to list authors with their books.
+    
+    Endpoint: GET /api/authors/
+    
+    Permissions:
+        - Read-only access for all users (authenticated and unauthenticated)
+    
+    Searching and Ordering:
+        Examples:
+            - /api/authors/?search=orwell
+            - /api/authors/?ordering=-book_count
+    
+    Nested Books:
+        Examples:
+            - /api/authors/?books_limit=3 - at most 3 books per author;
+              book_count is still the total
+    
+    Returns:
+        - Paginated list of authors serialized with AuthorSerializer
+    """
+    search_fields = ['name']
+    
+    ordering_fields = ['name', 'book_count']
+    
+    ordering = ['name']
+
+
+class AuthorDetailView(AuthorQuerysetMixin, generics.RetrieveAPIView):
+    """
+    API view to retrieve a single author with their books.
+    
+    Endpoint: GET /api/authors/<int:pk>/
+    
+    Permissions:
+        - Read-only access for all users (authenticated and unauthenticated)
+    
+    Usage:
+        GET /api/authors/1/
+        GET /api/authors/1/?books_limit=10
+    """
@@ -9,5 +9,11 @@ class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=100)
     
+    class Meta:
+        constraints = [
+            # Natural key of the upsert action; also the index its conflicts are checked against
+            models.UniqueConstraint(fields=['title', 'author'], name='unique_book_title_author'),
+        ]
+    
     def __str__(self):
         return self.title
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 from .models import Book
 
 
@@ -10,3 +11,14 @@ class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = '__all__'  # Include all fields: id, title, author
+        # A book is identified by its title and author (see the upsert action)
+        validators = [UniqueTogetherValidator(queryset=Book.objects.all(), fields=['title', 'author'])]
+
+
+class BookUpsertSerializer(BookSerializer):
+    """
+    Serializer for one book of an upsert payload.
+    An existing (title, author) is not an error here: that book is updated.
+    """
+    class Meta(BookSerializer.Meta):
+        validators = []
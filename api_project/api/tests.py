@@ -1,3 +1,102 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Book
+from . import views
+
+
+class BookUpsertTestCase(APITestCase):
+    """
+    PUT /api/books_all/upsert/ creates or updates books by (title, author)
+    with one INSERT statement per request.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('book_all-upsert')
+        self.book = Book.objects.create(title='1984', author='George Orwell')
+
+    def test_single_book(self):
+        response = self.client.put(self.url, {'title': '1984', 'author': 'George Orwell'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': self.book.id, 'title': '1984', 'author': 'George Orwell'})
+
+        response = self.client.put(self.url, {'title': 'Animal Farm', 'author': 'George Orwell'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Book.objects.get(title='Animal Farm').id, response.data['id'])
+
+    def test_batch_is_one_insert(self):
+        payload = [
+            {'title': 'Animal Farm', 'author': 'George Orwell'},
+            {'title': '1984', 'author': 'George Orwell'},
+            {'title': 'Emma', 'author': 'Jane Austen'},
+            {'title': 'Animal Farm', 'author': 'George Orwell'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, payload, format='json')
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT')]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual([book['title'] for book in response.data], ['Animal Farm', '1984', 'Emma', 'Animal Farm'])
+        self.assertEqual(response.data[1]['id'], self.book.id)
+        self.assertEqual(response.data[0]['id'], response.data[3]['id'])
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_largest_batch_is_one_insert_and_one_select(self):
+        payload = [{'title': f'Book {i}', 'author': f'Author {i % 7}'} for i in range(views.upsert_max_books())]
+        # Shares its title with the new books but not its author: must not be read back
+        Book.objects.create(title='Book 1', author='Someone else')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, payload, format='json')
+        statements = [query['sql'].split()[0] for query in queries]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(statements.count('INSERT'), 1)
+        self.assertEqual(statements.count('SELECT'), 1)
+        self.assertEqual([book['author'] for book in response.data[:2]], ['Author 0', 'Author 1'])
+
+    def test_conflicting_row_keeps_its_id_when_updated(self):
+        # Book has no fields outside the key yet; overwrite the title with itself
+        # to run the update_conflicts path that fields added later will use
+        with mock.patch.object(views, 'upsert_update_fields', lambda: ['title']):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.put(self.url, [
+                    {'title': '1984', 'author': 'George Orwell'},
+                    {'title': 'Emma', 'author': 'Jane Austen'},
+                ], format='json')
+        insert = next(query['sql'] for query in queries if query['sql'].startswith('INSERT'))
+
+        self.assertIn('DO UPDATE', insert)
+        self.assertEqual(response.data[0]['id'], self.book.id)
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_invalid_batches(self):
+        response = self.client.put(self.url, [{'title': 'Emma'}], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('author', response.data[0])
+
+        response = self.client.put(self.url, [], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload = [{'title': f'Book {i}', 'author': 'Author'} for i in range(views.upsert_max_books() + 1)]
+        response = self.client.put(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_create_rejects_existing_key(self):
+        response = self.client.post(reverse('book_all-list'), {'title': '1984', 'author': 'George Orwell'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,7 +1,41 @@
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Q
 from rest_framework import generics, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
 from .models import Book
-from .serializers import BookSerializer
+from .serializers import BookSerializer, BookUpsertSerializer
+
+# Natural key of a book for the upsert action (unique_book_title_author)
+UPSERT_KEY = ['title', 'author']
+# Upper bound of an upsert batch; see upsert_max_books() for the database's own
+UPSERT_MAX_BOOKS = 1000
+
+
+def upsert_max_books():
+    """
+    Return how many books one upsert request may send: as many as fit in a
+    single INSERT, since bulk_create() splits larger batches at the
+    database's query parameter limit (499 books on SQLite).
+    """
+    fields = [field for field in Book._meta.concrete_fields if not field.primary_key]
+    return min(UPSERT_MAX_BOOKS, connection.ops.bulk_batch_size(fields, [None] * UPSERT_MAX_BOOKS))
+
+
+def upsert_update_fields():
+    """
+    Return the fields an upsert overwrites on a conflict: every field but the
+    key. Book has no other fields yet, so conflicting rows are left as they are.
+    """
+    return [
+        field.name for field in Book._meta.concrete_fields
+        if not field.primary_key and field.name not in UPSERT_KEY
+    ]
 
 
 class BookList(generics.ListAPIView):
@@ -33,7 +67,46 @@ class BookViewSet(viewsets.ModelViewSet):
     - update: PUT /books_all/<id>/ - Update a book (authenticated users)
     - partial_update: PATCH /books_all/<id>/ - Partially update a book (authenticated users)
     - destroy: DELETE /books_all/<id>/ - Delete a book (authenticated users)
+    - upsert: PUT /books_all/upsert/ - Create or update books by title and author (authenticated users)
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]  # Require authentication for all actions
+    
+    @action(detail=False, methods=['put'])
+    def upsert(self, request):
+        """
+        Create or update books identified by (title, author).
+        
+        Accepts one book or a list of up to upsert_max_books() books and
+        returns them, with their ids, in the same shape and order. The whole
+        batch is written by a single INSERT ... ON CONFLICT statement and
+        read back by one SELECT; if a key appears twice, the last occurrence wins.
+        """
+        many = isinstance(request.data, list)
+        max_books = upsert_max_books()
+        if many and len(request.data) > max_books:
+            raise ValidationError(f'At most {max_books} books can be upserted at once')
+        kwargs = {'many': True, 'allow_empty': False} if many else {}
+        serializer = BookUpsertSerializer(data=request.data, **kwargs)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data if many else [serializer.validated_data]
+        keys = [tuple(row[field] for field in UPSERT_KEY) for row in rows]
+        # A statement may not update the same row twice
+        books = {key: Book(**row) for key, row in zip(keys, rows)}
+        
+        update_fields = upsert_update_fields()
+        if update_fields:
+            conflicts = {'update_conflicts': True, 'unique_fields': UPSERT_KEY, 'update_fields': update_fields}
+        else:
+            conflicts = {'ignore_conflicts': True}
+        
+        with transaction.atomic():
+            Book.objects.bulk_create(books.values(), **conflicts)
+            # bulk_create() does not set the ids of upserted rows. The exact
+            # pairs take as many parameters as the INSERT, so this is one query.
+            saved = Book.objects.filter(reduce(or_, (Q(title=title, author=author) for title, author in books)))
+            saved = {(book.title, book.author): book for book in saved}
+        
+        result = [saved[key] for key in keys]
+        return Response(BookSerializer(result if many else result[0], many=many).data)
@@ -1,3 +1,9 @@
+from pathlib import Path
+
+from LibraryProject.sqlite import sqlite_database
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -11,4 +17,9 @@ INSTALLED_APPS = [
 # Login redirect URL
 LOGIN_REDIRECT_URL = 'list_books'
 LOGOUT_REDIRECT_URL = 'login'
-LOGIN_URL = 'login'
\ No newline at end of file
+LOGIN_URL = 'login'
+
+# WAL, busy timeout and cache pragmas are applied per connection (see sqlite.py)
+DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
+}
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, FollowSuggestion
 
 
 class CustomUserAdmin(UserAdmin):
@@ -13,4 +13,10 @@ class CustomUserAdmin(UserAdmin):
     )
 
 
-admin.site.register(CustomUser, CustomUserAdmin)
\ No newline at end of file
+admin.site.register(CustomUser, CustomUserAdmin)
+
+
+@admin.register(FollowSuggestion)
+class FollowSuggestionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'suggested_user', 'mutual_count', 'rank', 'computed_at']
+    search_fields = ['user__username', 'suggested_user__username']
@@ -0,0 +1,104 @@
+"""
+Follow-graph adjacency cache.
+
+Each user's following set is stored in the cache backend as a sorted array of
+64-bit user ids, so membership checks are a binary search instead of a query
+against the followers join table. The entry is dropped whenever the follow
+relation changes (see the m2m_changed receiver in accounts.models).
+
+That only reaches other workers through a shared cache (REDIS_URL). A
+local-memory cache is private to each process, where a follow handled by
+another worker would leave the set stale, so with one the sets are not
+cached unless FOLLOWING_CACHE_TIMEOUT is set explicitly, and follow checks
+are a single EXISTS query on the join table instead.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+def _cache_is_shared():
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def following_cache_timeout():
+    """
+    Seconds to cache following sets for, 0 for not at all.
+
+    Read on every call rather than at import, so it follows the CACHES and
+    FOLLOWING_CACHE_TIMEOUT settings in effect.
+    """
+    return getattr(settings, 'FOLLOWING_CACHE_TIMEOUT', 60 * 60 if _cache_is_shared() else 0)
+
+
+def following_cache_key(user_id):
+    return f'accounts:following:{user_id}'
+
+
+def _following_rows(user_id):
+    from .models import CustomUser
+
+    # user.following is the reverse side of CustomUser.followers, so the
+    # users followed by user_id are the "from" rows where user_id is the "to".
+    return CustomUser.followers.through.objects.filter(to_customuser_id=user_id)
+
+
+def _load_following_ids(user_id):
+    ids = _following_rows(user_id).values_list('from_customuser_id', flat=True)
+    return array('q', sorted(ids))
+
+
+def get_following_ids(user_id):
+    """
+    Return the ids of the users that user_id follows as a sorted array('q').
+    """
+    timeout = following_cache_timeout()
+    if not timeout:
+        return _load_following_ids(user_id)
+    key = following_cache_key(user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        ids = array('q')
+        ids.frombytes(cached)
+        return ids
+
+    ids = _load_following_ids(user_id)
+    cache.set(key, ids.tobytes(), timeout)
+    return ids
+
+
+def is_following(user_id, target_id):
+    """
+    Return True if user_id follows target_id, in O(log n) over the cached set.
+    """
+    if not following_cache_timeout():
+        # Nothing to reuse the set for: look up the one row instead
+        return _following_rows(user_id).filter(from_customuser_id=target_id).exists()
+    ids = get_following_ids(user_id)
+    index = bisect_left(ids, target_id)
+    return index < len(ids) and ids[index] == target_id
+
+
+def load_follow_adjacency():
+    """
+    Read the whole follow relation in one query as {user_id: set(following_ids)}.
+
+    Meant for batch jobs such as suggestion precomputation, not for requests.
+    """
+    from .models import CustomUser
+
+    adjacency = {}
+    edges = CustomUser.followers.through.objects.values_list('to_customuser_id', 'from_customuser_id')
+    for follower_id, followed_id in edges.iterator(chunk_size=10000):
+        adjacency.setdefault(follower_id, set()).add(followed_id)
+    return adjacency
+
+
+def invalidate_following(*user_ids):
+    """
+    Drop the cached following sets of the given users.
+    """
+    cache.delete_many([following_cache_key(user_id) for user_id in user_ids])
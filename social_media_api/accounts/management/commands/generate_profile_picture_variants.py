@@ -0,0 +1,32 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.media import PROFILE_PICTURE_VARIANTS, generate_variants
+
+
+class Command(BaseCommand):
+    help = 'Render the resized variants of profile pictures that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render every profile picture, e.g. after changing PROFILE_PICTURE_VARIANTS')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        started = time.monotonic()
+        rendered = failed = 0
+        for user_id, variants in users.values_list('pk', 'profile_picture_variants').iterator():
+            if not options['all'] and set(PROFILE_PICTURE_VARIANTS) <= set(variants):
+                continue
+            try:
+                generate_variants(user_id)
+                rendered += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'User {user_id}: {exc}')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered variants for {rendered} users in {elapsed:.2f}s ({failed} failed)'
+        ))
@@ -0,0 +1,246 @@
+"""
+Profile picture pipeline.
+
+Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to a temporary
+file by Django's upload handlers. validate_profile_picture() then checks the
+size, decodes only the image header (format and dimensions, never the
+pixels) and renames the upload after a SHA-256 of its content, read in
+chunks.
+
+Resized variants (PROFILE_PICTURE_VARIANTS, e.g. avatar and thumb) are
+rendered after the transaction commits by a background thread and stored
+under content-hashed names too, so every URL can be cached immutably:
+a new picture always gets new URLs. Until the variants exist,
+profile_picture_urls() falls back to the original.
+
+When a picture is replaced or removed, the same thread deletes the old
+original and those of its variants no other user shares.
+"""
+import atexit
+import hashlib
+import io
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PICTURE_MAX_BYTES = getattr(settings, 'PROFILE_PICTURE_MAX_BYTES', 5 * 1024 * 1024)
+# Rejects decompression bombs: a small file that decodes to a huge bitmap
+PROFILE_PICTURE_MAX_PIXELS = getattr(settings, 'PROFILE_PICTURE_MAX_PIXELS', 25_000_000)
+PROFILE_PICTURE_FORMATS = getattr(settings, 'PROFILE_PICTURE_FORMATS', ('JPEG', 'PNG', 'GIF', 'WEBP'))
+# Variant name -> edge length in pixels of the square crop
+PROFILE_PICTURE_VARIANTS = getattr(settings, 'PROFILE_PICTURE_VARIANTS', {'avatar': 256, 'thumb': 64})
+PROFILE_PICTURE_VARIANT_QUALITY = getattr(settings, 'PROFILE_PICTURE_VARIANT_QUALITY', 85)
+
+VARIANT_DIRECTORY = 'profile_pictures/variants'
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def read_image_header(file):
+    """
+    Return (format, width, height) from the image header without decoding
+    the pixel data. Raises ValidationError for anything that is not a
+    supported image.
+    """
+    try:
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        raise ValidationError('Upload a valid image. The file is not an image or is corrupted.')
+    finally:
+        file.seek(0)
+    if image_format not in PROFILE_PICTURE_FORMATS:
+        raise ValidationError(f'Unsupported image format {image_format}.')
+    if width * height > PROFILE_PICTURE_MAX_PIXELS:
+        raise ValidationError(f'Image is too large ({width}x{height} pixels).')
+    return image_format, width, height
+
+
+def validate_profile_picture(file):
+    """
+    Validate an uploaded profile picture and give it a content-hashed name.
+    """
+    if file.size > PROFILE_PICTURE_MAX_BYTES:
+        raise ValidationError(f'Profile pictures may be at most {PROFILE_PICTURE_MAX_BYTES // (1024 * 1024)} MB.')
+    image_format, _, _ = read_image_header(file)
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    file.name = f'{content_hash(file)[:32]}.{extension}'
+    return file
+
+
+def render_variant(image, size):
+    """
+    Return WebP bytes of a size x size centre crop of image.
+    """
+    variant = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    variant.save(output, 'WEBP', quality=PROFILE_PICTURE_VARIANT_QUALITY)
+    return output.getvalue()
+
+
+def generate_variants(user_id):
+    """
+    Render and store the variants of user_id's current profile picture.
+    Returns the stored {variant: storage name} mapping.
+    """
+    User = get_user_model()
+    source = User.objects.filter(pk=user_id).values_list('profile_picture', flat=True).first()
+    if not source:
+        return {}
+
+    with default_storage.open(source) as file, Image.open(file) as image:
+        # JPEGs are decoded at a reduced scale that still covers the largest variant
+        largest = max(PROFILE_PICTURE_VARIANTS.values())
+        image.draft('RGB', (largest, largest))
+        # Apply the camera orientation before cropping, and drop palette/CMYK modes
+        image = ImageOps.exif_transpose(image)
+        if image.mode.startswith('I'):
+            # 16-bit greyscale: convert() would clip every value above 255 to white
+            image = image.convert('I').point(lambda value: value / 256).convert('L')
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        variants = {}
+        stored = {}
+        for name, size in PROFILE_PICTURE_VARIANTS.items():
+            data = render_variant(image, size)
+            path = f'{VARIANT_DIRECTORY}/{hashlib.sha256(data).hexdigest()[:32]}.webp'
+            # Same content, same name: identical variants are stored once
+            if not default_storage.exists(path):
+                path = stored[name] = default_storage.save(path, ContentFile(data))
+            variants[name] = path
+
+    # Skip the update if another picture was uploaded in the meantime, and
+    # drop the files that were stored for the replaced one
+    if not User.objects.filter(pk=user_id, profile_picture=source).update(profile_picture_variants=variants):
+        delete_unused_files(None, stored)
+        return {}
+    return variants
+
+
+def variant_in_use(path, names):
+    """
+    Return whether any user's variants (under one of names) point at path.
+    """
+    query = Q()
+    for name in names:
+        query |= Q(**{f'profile_picture_variants__{name}': path})
+    return get_user_model().objects.filter(query).exists()
+
+
+def delete_unused_files(original, variants):
+    """
+    Delete a replaced profile picture and the variants in the {variant: storage
+    name} mapping that no user refers to any more.
+    """
+    User = get_user_model()
+    if original and not User.objects.filter(profile_picture=original).exists():
+        default_storage.delete(original)
+    names = set(PROFILE_PICTURE_VARIANTS) | set(variants)
+    for path in set(variants.values()):
+        if not variant_in_use(path, names):
+            default_storage.delete(path)
+
+
+def profile_picture_urls(user, request=None):
+    """
+    Return {'original': url, <variant>: url, ...} for user's picture, or None.
+    Variants that are not rendered yet point at the original.
+    """
+    if not user.profile_picture:
+        return None
+    original = user.profile_picture.url
+    urls = {'original': original}
+    for name in PROFILE_PICTURE_VARIANTS:
+        path = user.profile_picture_variants.get(name)
+        urls[name] = default_storage.url(path) if path else original
+    if request is not None:
+        urls = {name: request.build_absolute_uri(url) for name, url in urls.items()}
+    return urls
+
+
+class VariantWorker:
+    """
+    Background thread that renders profile picture variants one user at a
+    time and deletes the files of replaced pictures.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, user_id):
+        self._put(generate_variants, user_id)
+
+    def delete(self, original, variants):
+        self._put(delete_unused_files, original, variants)
+
+    def close(self):
+        """
+        Render everything still queued, then stop the thread.
+        """
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _put(self, function, *args):
+        with self._lock:
+            self._start()
+        self._queue.put((function, args))
+
+    def _start(self):
+        # Started on first use so a worker created before a fork runs in each process
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='profile-picture-variants', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            function, args = task
+            try:
+                function(*args)
+            except Exception:
+                logger.exception('Profile picture task %s%r failed', function.__name__, args)
+            finally:
+                close_old_connections()
+
+
+variant_worker = VariantWorker()
+atexit.register(variant_worker.close)
+
+
+def schedule_variants(user):
+    """
+    Render user's variants in the background once the current transaction commits.
+    """
+    transaction.on_commit(lambda: variant_worker.add(user.pk))
+
+
+def schedule_delete(original, variants):
+    """
+    Delete a replaced picture and its unshared variants in the background
+    once the current transaction commits.
+    """
+    transaction.on_commit(lambda: variant_worker.delete(original, variants))
@@ -1,10 +1,16 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .graph import invalidate_following
 
 
 class CustomUser(AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    # Variant name -> storage name of the resized copies, rendered by accounts.media
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     followers = models.ManyToManyField(
         'self',
         symmetrical=False,
@@ -13,4 +19,41 @@ class CustomUser(AbstractUser):
     )
 
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+
+# Keep the cached following sets in accounts.graph in step with the follow relation
+@receiver(m2m_changed, sender=CustomUser.followers.through)
+def invalidate_following_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.following.add/remove/clear(): only user's own set changes
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_following(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        # user.followers.add/remove(): the added/removed followers' sets change
+        invalidate_following(*pk_set)
+    elif action == 'pre_clear':
+        # pk_set is None for clear(), so remember who is about to be removed
+        instance._cleared_follower_ids = list(instance.followers.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        invalidate_following(*getattr(instance, '_cleared_follower_ids', []))
+
+
+class FollowSuggestion(models.Model):
+    """
+    Precomputed "who to follow" entry, rebuilt by the compute_follow_suggestions command.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested_user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    mutual_count = models.PositiveIntegerField(default=0)
+    rank = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='unique_follow_suggestion_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.suggested_user_id} suggested to {self.user_id}'
@@ -1,16 +1,41 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.authtoken.models import Token
+from .media import profile_picture_urls, schedule_delete, schedule_variants, validate_profile_picture
+from .models import FollowSuggestion
 
 User = get_user_model()
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class ProfilePictureField(serializers.FileField):
+    """
+    Image upload validated from its header only and renamed after its content
+    (see accounts.media), instead of ImageField's full decode.
+    """
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        try:
+            return validate_profile_picture(file)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+
+
+class ProfilePictureUrlsMixin(serializers.Serializer):
+    profile_picture_urls = serializers.SerializerMethodField()
+
+    def get_profile_picture_urls(self, obj):
+        return profile_picture_urls(obj, self.context.get('request'))
+
+
+class UserRegistrationSerializer(ProfilePictureUrlsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    profile_picture = ProfilePictureField(required=False, allow_null=True)
 
     class Meta:
         model = User
-        fields = ['username', 'email', 'password', 'bio', 'profile_picture']
+        fields = ['username', 'email', 'password', 'bio', 'profile_picture', 'profile_picture_urls']
 
     def create(self, validated_data):
         user = get_user_model().objects.create_user(
@@ -22,6 +47,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         user.profile_picture = validated_data.get('profile_picture', None)
         user.save()
         Token.objects.create(user=user)
+        if user.profile_picture:
+            schedule_variants(user)
         return user
 
 
@@ -30,17 +57,44 @@ class UserLoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(ProfilePictureUrlsMixin, serializers.ModelSerializer):
+    profile_picture = ProfilePictureField(required=False, allow_null=True)
     followers_count = serializers.SerializerMethodField()
     following_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'bio', 'profile_picture', 'followers_count', 'following_count']
+        fields = [
+            'id', 'username', 'email', 'bio', 'profile_picture', 'profile_picture_urls',
+            'followers_count', 'following_count',
+        ]
         read_only_fields = ['id', 'username']
 
+    def update(self, instance, validated_data):
+        picture_changed = 'profile_picture' in validated_data
+        old_picture, old_variants = instance.profile_picture.name, instance.profile_picture_variants
+        if picture_changed:
+            # The old variants belong to the old picture
+            validated_data['profile_picture_variants'] = {}
+        instance = super().update(instance, validated_data)
+        if picture_changed and instance.profile_picture:
+            schedule_variants(instance)
+        if picture_changed and old_picture and old_picture != instance.profile_picture.name:
+            schedule_delete(old_picture, old_variants)
+        return instance
+
     def get_followers_count(self, obj):
         return obj.followers.count()
 
     def get_following_count(self, obj):
-        return obj.following.count()
\ No newline at end of file
+        return obj.following.count()
+
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='suggested_user.id', read_only=True)
+    username = serializers.CharField(source='suggested_user.username', read_only=True)
+    bio = serializers.CharField(source='suggested_user.bio', read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ['id', 'username', 'bio', 'mutual_count']
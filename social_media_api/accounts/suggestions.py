@@ -0,0 +1,60 @@
+"""
+Friends-of-friends follow suggestions.
+
+Candidates for a user are the accounts followed by the people they follow,
+scored by how many of those people follow the candidate (mutual count).
+Scores are computed in batch over the full follow adjacency and stored in
+FollowSuggestion, so serving a page of suggestions is a single indexed read.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .graph import load_follow_adjacency
+from .models import FollowSuggestion
+
+
+def rank_candidates(adjacency, user_id, limit):
+    """
+    Return up to limit (candidate_id, mutual_count) pairs for user_id,
+    best first. Ties are broken by the lower user id for stable output.
+    """
+    following = adjacency.get(user_id, set())
+    counts = Counter()
+    for followed_id in following:
+        counts.update(adjacency.get(followed_id, set()) - following)
+    counts.pop(user_id, None)
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit]
+
+
+def rebuild_suggestions(limit=20, batch_size=1000):
+    """
+    Recompute the suggestion table for every user that follows someone.
+
+    Rows are replaced in batches of batch_size users, each batch in its own
+    transaction, so readers never see a user with a half-written list.
+    Returns (users_processed, suggestions_written).
+    """
+    started_at = timezone.now()
+    adjacency = load_follow_adjacency()
+    user_ids = sorted(adjacency)
+    written = 0
+
+    for start in range(0, len(user_ids), batch_size):
+        batch_ids = user_ids[start:start + batch_size]
+        rows = [
+            FollowSuggestion(user_id=user_id, suggested_user_id=candidate_id,
+                             mutual_count=mutual_count, rank=rank)
+            for user_id in batch_ids
+            for rank, (candidate_id, mutual_count) in enumerate(rank_candidates(adjacency, user_id, limit), start=1)
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=batch_ids).delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+
+    # Users who no longer follow anyone keep no stale suggestions
+    FollowSuggestion.objects.filter(computed_at__lt=started_at).delete()
+    return len(user_ids), written
@@ -0,0 +1,296 @@
+import hashlib
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from posts.models import Post
+
+from . import graph, media
+from .models import FollowSuggestion
+from .suggestions import rank_candidates, rebuild_suggestions
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, FOLLOWING_CACHE_TIMEOUT=60 * 60)
+class FollowingCacheTestCase(TestCase):
+    """
+    Following, unfollowing and admin edits drop the cached following set, so
+    follow checks and the feed never see a stale one.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.key = graph.following_cache_key(self.user.pk)
+
+    def test_follow_and_unfollow_drop_cached_set(self):
+        self.assertFalse(graph.is_following(self.user.pk, self.author.pk))
+        self.assertIsNotNone(cache.get(self.key))
+
+        response = self.client.post(f'/api/accounts/follow/{self.author.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(self.key))
+        self.assertTrue(graph.is_following(self.user.pk, self.author.pk))
+        self.assertEqual(self.client.post(f'/api/accounts/follow/{self.author.pk}/').status_code, 400)
+
+        response = self.client.post(f'/api/accounts/unfollow/{self.author.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(graph.is_following(self.user.pk, self.author.pk))
+        self.assertEqual(self.client.post(f'/api/accounts/unfollow/{self.author.pk}/').status_code, 400)
+
+    def test_followers_side_changes_drop_cached_sets(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        graph.get_following_ids(self.user.pk)
+        graph.get_following_ids(other.pk)
+
+        self.author.followers.add(self.user, other)
+        self.assertEqual(list(graph.get_following_ids(self.user.pk)), [self.author.pk])
+        self.assertEqual(list(graph.get_following_ids(other.pk)), [self.author.pk])
+
+        self.author.followers.clear()
+        self.assertFalse(graph.is_following(self.user.pk, self.author.pk))
+        self.assertFalse(graph.is_following(other.pk, self.author.pk))
+
+    def test_feed_follows_the_cached_set(self):
+        Post.objects.create(author=self.author, title='Title', content='content')
+        self.assertEqual(self.client.get('/api/feed/').data['count'], 0)
+
+        self.client.post(f'/api/accounts/follow/{self.author.pk}/')
+        self.assertEqual(self.client.get('/api/feed/').data['count'], 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UncachedFollowingTestCase(TestCase):
+    """
+    Without a shared cache the following sets are not cached, and a follow
+    check reads the one join table row it needs.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.others = [User.objects.create_user(username=f'other{i}', password='testpass123') for i in range(3)]
+        self.user.following.add(self.author, *self.others)
+        self.key = graph.following_cache_key(self.user.pk)
+
+    def test_local_memory_cache_is_not_used_by_default(self):
+        # Without REDIS_URL the cache is LocMemCache, private to each worker process
+        self.assertEqual(graph.following_cache_timeout(), 0)
+        self.assertEqual(list(graph.get_following_ids(self.user.pk)), sorted(u.pk for u in [self.author, *self.others]))
+        self.assertIsNone(cache.get(self.key))
+
+    def test_is_following_checks_one_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(graph.is_following(self.user.pk, self.author.pk))
+            self.assertFalse(graph.is_following(self.author.pk, self.user.pk))
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertIn('LIMIT 1', query['sql'])
+        self.assertIsNone(cache.get(self.key))
+
+    def test_cache_backend_is_read_at_call_time(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(graph.following_cache_timeout(), 60 * 60)
+            self.assertTrue(graph.is_following(self.user.pk, self.author.pk))
+            self.assertIsNotNone(cache.get(self.key))
+        with override_settings(FOLLOWING_CACHE_TIMEOUT=5):
+            self.assertEqual(graph.following_cache_timeout(), 5)
+        self.assertEqual(graph.following_cache_timeout(), 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowSuggestionTestCase(TestCase):
+    """
+    Friends-of-friends candidates are ranked by mutual count, stored by
+    rebuild_suggestions() and served without the accounts already followed.
+    """
+
+    def setUp(self):
+        self.user, self.friend1, self.friend2, self.popular, self.niche, self.loner = [
+            User.objects.create_user(username=name, password='testpass123')
+            for name in ('user', 'friend1', 'friend2', 'popular', 'niche', 'loner')
+        ]
+        self.friend1.followers.add(self.user)
+        self.friend2.followers.add(self.user)
+        self.popular.followers.add(self.friend1, self.friend2)
+        self.niche.followers.add(self.friend2)
+        # Followed by a friend, but the user already follows it
+        self.friend2.followers.add(self.friend1)
+        # Followed back by a friend: the user is never suggested to themselves
+        self.user.followers.add(self.friend1)
+
+    def test_rank_candidates(self):
+        adjacency = graph.load_follow_adjacency()
+        self.assertEqual(
+            rank_candidates(adjacency, self.user.pk, limit=10),
+            [(self.popular.pk, 2), (self.niche.pk, 1)],
+        )
+        self.assertEqual(rank_candidates(adjacency, self.user.pk, limit=1), [(self.popular.pk, 2)])
+        self.assertEqual(rank_candidates(adjacency, self.loner.pk, limit=10), [])
+
+    def test_rebuild_replaces_stale_suggestions(self):
+        FollowSuggestion.objects.create(user=self.loner, suggested_user=self.user, rank=1)
+        self.assertEqual(rebuild_suggestions(limit=10, batch_size=1), (3, 3))
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(user=self.user).values_list('suggested_user', 'mutual_count', 'rank')),
+            [(self.popular.pk, 2, 1), (self.niche.pk, 1, 2)],
+        )
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.loner).exists())
+
+    def test_list_skips_users_followed_since_the_rebuild(self):
+        rebuild_suggestions()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/accounts/suggestions/')
+        self.assertEqual([row['username'] for row in response.data['results']], ['popular', 'niche'])
+        self.assertEqual(response.data['results'][0]['mutual_count'], 2)
+
+        self.popular.followers.add(self.user)
+        response = client.get('/api/accounts/suggestions/')
+        self.assertEqual([row['username'] for row in response.data['results']], ['niche'])
+
+
+def image_bytes(mode, image_format, size=(300, 200), color=0):
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, image_format)
+    return output.getvalue()
+
+
+def png_upload(color=0, name='picture.png'):
+    return SimpleUploadedFile(name, image_bytes('RGB', 'PNG', color=color), content_type='image/png')
+
+
+class ProfilePictureTestCase(TestCase):
+    """
+    Uploads are checked from their header and named after their content;
+    variants are rendered for every image mode and deleted with their picture.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root, SECURE_SSL_REDIRECT=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Run the background tasks in the test's thread and transaction
+        patcher = mock.patch.object(media.variant_worker, '_put', lambda function, *args: function(*args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='pictured', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, upload):
+        """
+        PATCH the profile picture and run the tasks it schedules on commit.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/accounts/profile/', {'profile_picture': upload}, format='multipart')
+        self.user.refresh_from_db()
+        return response
+
+    def test_header_validation(self):
+        self.assertEqual(media.read_image_header(png_upload()), ('PNG', 300, 200))
+        bmp = SimpleUploadedFile('picture.bmp', image_bytes('RGB', 'BMP'))
+        with self.assertRaisesMessage(ValidationError, 'Unsupported image format BMP'):
+            media.read_image_header(bmp)
+        with self.assertRaisesMessage(ValidationError, 'not an image'):
+            media.read_image_header(SimpleUploadedFile('picture.png', b'not an image'))
+        with mock.patch.object(media, 'PROFILE_PICTURE_MAX_PIXELS', 300 * 200 - 1):
+            with self.assertRaisesMessage(ValidationError, 'too large (300x200 pixels)'):
+                media.read_image_header(png_upload())
+        with mock.patch.object(media, 'PROFILE_PICTURE_MAX_BYTES', 10):
+            with self.assertRaisesMessage(ValidationError, 'at most'):
+                media.validate_profile_picture(png_upload())
+
+    def test_upload_is_named_after_its_content(self):
+        data = image_bytes('RGB', 'JPEG')
+        upload = media.validate_profile_picture(SimpleUploadedFile('holiday.jpeg', data))
+        self.assertEqual(upload.name, f'{hashlib.sha256(data).hexdigest()[:32]}.jpg')
+        self.assertEqual(upload.read(), data)
+
+    def test_bad_upload_is_rejected(self):
+        response = self.upload(SimpleUploadedFile('picture.png', b'not an image', content_type='image/png'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('profile_picture', response.data)
+        self.assertFalse(self.user.profile_picture)
+
+    def test_variants_of_every_image_mode(self):
+        cases = [('P', 'PNG'), ('CMYK', 'JPEG'), ('LA', 'PNG'), ('I;16', 'PNG'), ('1', 'PNG')]
+        for mode, image_format in cases:
+            with self.subTest(mode=mode):
+                name = default_storage.save(f'profile_pictures/{mode}.img', ContentFile(image_bytes(mode, image_format, color=1)))
+                User.objects.filter(pk=self.user.pk).update(profile_picture=name, profile_picture_variants={})
+                call_command('generate_profile_picture_variants', stdout=io.StringIO())
+                self.user.refresh_from_db()
+                self.assertEqual(set(self.user.profile_picture_variants), set(media.PROFILE_PICTURE_VARIANTS))
+                with default_storage.open(self.user.profile_picture_variants['thumb']) as file, Image.open(file) as thumb:
+                    self.assertEqual((thumb.format, thumb.size), ('WEBP', (64, 64)))
+
+    def test_16_bit_greyscale_is_not_clipped(self):
+        name = default_storage.save('profile_pictures/grey.png', ContentFile(image_bytes('I;16', 'PNG', color=32768)))
+        User.objects.filter(pk=self.user.pk).update(profile_picture=name)
+        variants = media.generate_variants(self.user.pk)
+        with default_storage.open(variants['thumb']) as file, Image.open(file) as thumb:
+            red, green, blue = thumb.convert('RGB').getpixel((32, 32))
+        self.assertAlmostEqual(red, 128, delta=2)
+
+    def test_replaced_picture_and_its_variants_are_deleted(self):
+        self.upload(png_upload(color=(255, 0, 0)))
+        old = [self.user.profile_picture.name, *self.user.profile_picture_variants.values()]
+        self.assertTrue(all(default_storage.exists(path) for path in old))
+
+        self.upload(png_upload(color=(0, 0, 255)))
+        new = [self.user.profile_picture.name, *self.user.profile_picture_variants.values()]
+        self.assertFalse(any(default_storage.exists(path) for path in old))
+        self.assertTrue(all(default_storage.exists(path) for path in new))
+
+    def test_shared_variants_are_kept(self):
+        other = User.objects.create_user(username='twin', password='testpass123')
+        self.upload(png_upload())
+        other.profile_picture = default_storage.save('profile_pictures/twin.png', ContentFile(image_bytes('RGB', 'PNG')))
+        other.save()
+        media.generate_variants(other.pk)
+        other.refresh_from_db()
+        self.assertEqual(other.profile_picture_variants, self.user.profile_picture_variants)
+        original = self.user.profile_picture.name
+
+        self.upload('')
+        self.assertFalse(default_storage.exists(original))
+        self.assertTrue(all(default_storage.exists(path) for path in other.profile_picture_variants.values()))
+
+    def test_variants_of_a_replaced_picture_are_not_kept(self):
+        self.user.profile_picture = default_storage.save('profile_pictures/old.png', ContentFile(image_bytes('RGB', 'PNG')))
+        self.user.save()
+        render = media.render_variant
+
+        def replace_during_render(image, size):
+            # Another request uploads a new picture while this one renders
+            User.objects.filter(pk=self.user.pk).update(profile_picture='profile_pictures/new.png')
+            return render(image, size)
+
+        with mock.patch.object(media, 'render_variant', replace_during_render):
+            self.assertEqual(media.generate_variants(self.user.pk), {})
+        self.assertEqual(default_storage.listdir(media.VARIANT_DIRECTORY)[1], [])
@@ -4,7 +4,8 @@ from .views import (
     UserLoginView, 
     UserProfileView,
     FollowUserView,
-    UnfollowUserView
+    UnfollowUserView,
+    FollowSuggestionListView
 )
 
 urlpatterns = [
@@ -13,4 +14,5 @@ urlpatterns = [
     path('profile/', UserProfileView.as_view(), name='profile'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
+    path('suggestions/', FollowSuggestionListView.as_view(), name='follow-suggestions'),
 ]
\ No newline at end of file
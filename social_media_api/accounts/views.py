@@ -4,7 +4,14 @@ from rest_framework.authtoken.models import Token
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate, get_user_model
 from django.shortcuts import get_object_or_404
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
+from .serializers import (
+    UserRegistrationSerializer,
+    UserLoginSerializer,
+    UserProfileSerializer,
+    FollowSuggestionSerializer
+)
+from .graph import get_following_ids, is_following
+from .models import FollowSuggestion
 
 CustomUser = get_user_model()
 
@@ -20,7 +27,7 @@ class UserRegistrationView(generics.CreateAPIView):
         user = serializer.save()
         token = Token.objects.get(user=user)
         return Response({
-            'user': UserRegistrationSerializer(user).data,
+            'user': UserRegistrationSerializer(user, context=self.get_serializer_context()).data,
             'token': token.key
         }, status=status.HTTP_201_CREATED)
 
@@ -39,7 +46,7 @@ class UserLoginView(APIView):
             token, created = Token.objects.get_or_create(user=user)
             return Response({
                 'token': token.key,
-                'user': UserProfileSerializer(user).data
+                'user': UserProfileSerializer(user, context={'request': request}).data
             }, status=status.HTTP_200_OK)
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
@@ -70,7 +77,7 @@ class FollowUserView(generics.GenericAPIView):
             )
         
         # Check if already following
-        if request.user.following.filter(id=user_id).exists():
+        if is_following(request.user.id, user_id):
             return Response(
                 {'error': 'You are already following this user'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -115,7 +122,7 @@ class UnfollowUserView(generics.GenericAPIView):
             )
         
         # Check if not following
-        if not request.user.following.filter(id=user_id).exists():
+        if not is_following(request.user.id, user_id):
             return Response(
                 {'error': 'You are not following this user'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -130,4 +137,26 @@ class UnfollowUserView(generics.GenericAPIView):
                 'unfollowed': user_to_unfollow.username
             },
             status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+
+
+class FollowSuggestionListView(generics.ListAPIView):
+    """
+    View to list "who to follow" suggestions for the authenticated user.
+    Served from the precomputed FollowSuggestion table (see the
+    compute_follow_suggestions command), ordered by rank.
+    """
+    serializer_class = FollowSuggestionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        # Skip users followed since the table was last rebuilt
+        following_ids = list(get_following_ids(user.id))
+        return (
+            FollowSuggestion.objects
+            .filter(user=user)
+            .exclude(suggested_user_id__in=following_ids)
+            .select_related('suggested_user')
+            .order_by('rank')
+        )
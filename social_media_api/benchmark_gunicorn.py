@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Benchmark the gunicorn_config.py profiles on this host and report the best one.
+
+Each profile is started in turn on a local port, warmed up, then loaded by
+--concurrency client threads for --duration seconds. The profile with the
+highest throughput whose p99 latency stays under --max-p99 ms wins.
+
+Usage:
+    python benchmark_gunicorn.py --path /api/posts/ --header "Authorization: Token <token>"
+    python benchmark_gunicorn.py --profiles sync gthread --concurrency 64 --duration 30
+"""
+import argparse
+import http.client
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OPTIONAL_DEPENDENCIES = {'gevent': 'gevent', 'asgi': 'uvicorn'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_load(port, path, headers, concurrency, duration):
+    """
+    Hammer the server with keep-alive connections. Returns (requests, errors, latencies_ms).
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        local, failed = [], 0
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+                local.append((time.perf_counter() - started) * 1000)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), errors[0], latencies
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def benchmark_profile(profile, args, headers):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PROFILE=profile, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_LOG_LEVEL='warning')
+    command = [sys.executable, '-m', 'gunicorn', '--config', os.path.join(BASE_DIR, 'gunicorn_config.py'),
+               '--access-logfile', '/dev/null']
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    try:
+        if not wait_for_port(port):
+            raise RuntimeError(f'gunicorn did not start for profile {profile}')
+        run_load(port, args.path, headers, args.concurrency, args.warmup)
+        count, errors, latencies = run_load(port, args.path, headers, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    return {
+        'profile': profile,
+        'rps': count / args.duration,
+        'errors': errors,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['sync', 'gthread', 'gevent', 'asgi'])
+    parser.add_argument('--path', default='/api/posts/', help='Endpoint to request (default: /api/posts/)')
+    parser.add_argument('--header', action='append', default=[], help='Extra request header, "Name: value"')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15.0, help='Measured seconds per profile')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Unmeasured seconds per profile')
+    parser.add_argument('--max-p99', type=float, default=500.0, help='Latency budget in ms for picking a winner')
+    args = parser.parse_args()
+
+    # Plain HTTP to gunicorn, marked as proxied TLS like nginx does (honoured
+    # when SECURE_PROXY_SSL_HEADER is set, otherwise SECURE_SSL_REDIRECT applies)
+    headers = {'X-Forwarded-Proto': 'https'}
+    for header in args.header:
+        name, _, value = header.partition(':')
+        headers[name.strip()] = value.strip()
+
+    results = []
+    for profile in args.profiles:
+        dependency = OPTIONAL_DEPENDENCIES.get(profile)
+        if dependency and importlib.util.find_spec(dependency) is None:
+            print(f'Skipping {profile}: {dependency} is not installed')
+            continue
+        print(f'Benchmarking {profile}...', flush=True)
+        results.append(benchmark_profile(profile, args, headers))
+
+    print(f"\n{'profile':<10}{'req/s':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for result in results:
+        print(f"{result['profile']:<10}{result['rps']:>10.1f}{result['errors']:>8}"
+              f"{result['p50']:>10.1f}{result['p95']:>10.1f}{result['p99']:>10.1f}")
+
+    eligible = [r for r in results if not r['errors'] and r['p99'] <= args.max_p99] or results
+    if eligible:
+        best = max(eligible, key=lambda r: r['rps'])
+        print(f"\nBest profile on this host: GUNICORN_PROFILE={best['profile']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Benchmark SQLite under concurrent readers and writers, with SQLite's
+defaults and with the SQLITE_PRAGMAS profile from social_media_api/sqlite.py.
+
+Each profile gets a fresh database file. --writers processes insert rows in
+small transactions and --readers processes run indexed range queries, all
+for --duration seconds. Reports reads/s, writes/s and how many operations
+failed with "database is locked".
+
+Usage:
+    python benchmark_sqlite.py
+    python benchmark_sqlite.py --writers 4 --readers 8 --duration 20
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from social_media_api.sqlite import SQLITE_PRAGMAS
+
+PROFILES = {
+    # journal_mode=DELETE and Python's 5 s default timeout, as before the tuning
+    'default': {},
+    'tuned': SQLITE_PRAGMAS,
+}
+
+SEED_ROWS = 10000
+
+
+def connect(path, pragmas):
+    # Autocommit: the workers issue BEGIN/COMMIT themselves, like Django does
+    connection = sqlite3.connect(path, isolation_level=None)
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+    return connection
+
+
+def create_database(path, pragmas):
+    connection = connect(path, pragmas)
+    connection.execute(
+        'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL, '
+        'title TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL)'
+    )
+    connection.execute('CREATE INDEX post_author_created ON post (author_id, created_at)')
+    connection.execute('BEGIN')
+    connection.executemany(
+        'INSERT INTO post (author_id, title, content, created_at) VALUES (?, ?, ?, ?)',
+        [(random.randrange(100), f'Post {i}', 'x' * 200, time.time()) for i in range(SEED_ROWS)],
+    )
+    connection.execute('COMMIT')
+    connection.close()
+
+
+def writer(path, pragmas, duration, rows_per_transaction, results):
+    connection = connect(path, pragmas)
+    done = locked = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            connection.execute('BEGIN')
+            for _ in range(rows_per_transaction):
+                connection.execute(
+                    'INSERT INTO post (author_id, title, content, created_at) VALUES (?, ?, ?, ?)',
+                    (random.randrange(100), 'Benchmark', 'x' * 200, time.time()),
+                )
+            connection.execute('COMMIT')
+            done += 1
+        except sqlite3.OperationalError:
+            locked += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    connection.close()
+    results.put(('write', done, locked))
+
+
+def reader(path, pragmas, duration, results):
+    connection = connect(path, pragmas)
+    done = locked = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            connection.execute(
+                'SELECT id, title, created_at FROM post WHERE author_id = ? ORDER BY created_at DESC LIMIT 20',
+                (random.randrange(100),),
+            ).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            locked += 1
+    connection.close()
+    results.put(('read', done, locked))
+
+
+def benchmark_profile(name, pragmas, args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        create_database(path, pragmas)
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=writer, args=(path, pragmas, args.duration, args.rows, results))
+            for _ in range(args.writers)
+        ] + [
+            multiprocessing.Process(target=reader, args=(path, pragmas, args.duration, results))
+            for _ in range(args.readers)
+        ]
+        for worker in workers:
+            worker.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for _ in workers:
+            kind, done, locked = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += locked
+        for worker in workers:
+            worker.join()
+    return {
+        'profile': name,
+        'reads': totals['read'][0] / args.duration,
+        'writes': totals['write'][0] / args.duration,
+        'locked': totals['read'][1] + totals['write'][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES), default=['default', 'tuned'])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=5, help='Rows inserted per write transaction')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.profiles:
+        print(f'Benchmarking {name}...', flush=True)
+        results.append(benchmark_profile(name, PROFILES[name], args))
+
+    print(f"\n{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'locked':>8}")
+    for result in results:
+        print(f"{result['profile']:<10}{result['reads']:>12.1f}{result['writes']:>12.1f}{result['locked']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Benchmark the token-bucket throttles of social_media_api/throttling.py
+against the cache backend configured in settings.
+
+Reports, in microseconds:
+
+    take_token    one bucket update (the cache round trips of a request)
+    throttle      the user and IP buckets of a request, as on the like endpoints
+    view          a DRF request to an empty view, without and with the throttles
+
+and the throughput of --threads threads taking tokens from one bucket.
+Exits with status 1 if the throttle adds more than --max-overhead-us to a
+request.
+
+Usage:
+    python benchmark_throttle.py
+    python benchmark_throttle.py --requests 50000 --threads 16
+    DJANGO_SETTINGS_MODULE=settings_production python benchmark_throttle.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import cache, caches  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+from rest_framework.settings import api_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from rest_framework.views import APIView  # noqa: E402
+
+from social_media_api.throttling import scoped_throttle, take_token  # noqa: E402
+
+# Large enough that no request of the benchmark is denied
+CAPACITY = 10 ** 9
+
+
+class EmptyView(APIView):
+    throttle_classes = []
+
+    def post(self, request):
+        return Response()
+
+
+class ThrottledView(EmptyView):
+    throttle_classes = [scoped_throttle('benchmark')]
+
+
+def timings(function, count):
+    """
+    Return the duration of each of count calls of function, in microseconds.
+    """
+    durations = []
+    for i in range(count):
+        start = time.perf_counter()
+        function(i)
+        durations.append((time.perf_counter() - start) * 1e6)
+    return durations
+
+
+def report(name, durations):
+    durations = sorted(durations)
+    p99 = durations[int(len(durations) * 0.99)]
+    print(f'{name:<22} mean {statistics.fmean(durations):8.1f} us   p99 {p99:8.1f} us')
+    return statistics.fmean(durations)
+
+
+def concurrent_throughput(threads, count):
+    def take():
+        for _ in range(count):
+            take_token('throttle:benchmark:concurrent', CAPACITY, 60, time.time())
+
+    workers = [threading.Thread(target=take) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=1000, help='distinct buckets the requests are spread over')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--max-overhead-us', type=float, default=1000)
+    options = parser.parse_args()
+
+    api_settings.DEFAULT_THROTTLE_RATES['benchmark'] = f'{CAPACITY}/min'
+    api_settings.DEFAULT_THROTTLE_RATES['benchmark.ip'] = f'{CAPACITY}/min'
+    backend = caches['default'].__class__
+    print(f'Cache backend: {backend.__module__}.{backend.__name__}')
+    cache.clear()
+
+    User = get_user_model()
+    users = [User(pk=pk, username=f'user{pk}') for pk in range(1, options.users + 1)]
+    factory = APIRequestFactory()
+    requests = []
+    for i, user in enumerate(users):
+        request = factory.post('/', REMOTE_ADDR=f'10.0.{i // 256 % 256}.{i % 256}')
+        force_authenticate(request, user=user)
+        requests.append(request)
+
+    def bucket_update(i):
+        take_token(f'throttle:benchmark:user:{i % options.users}', CAPACITY, 60, time.time())
+
+    drf_requests = [ThrottledView().initialize_request(request) for request in requests]
+
+    def throttles(i):
+        ThrottledView.throttle_classes[0]().allow_request(drf_requests[i % options.users], None)
+
+    empty, throttled = EmptyView.as_view(), ThrottledView.as_view()
+
+    report('take_token', timings(bucket_update, options.requests))
+    overhead = report('throttle', timings(throttles, options.requests))
+    base = report('view', timings(lambda i: empty(requests[i % options.users]), options.requests))
+    with_throttles = report('view + throttle', timings(lambda i: throttled(requests[i % options.users]), options.requests))
+    print(f'{"throttle share":<22} {100 * (with_throttles - base) / with_throttles:8.1f} % of the throttled view')
+
+    rate = concurrent_throughput(options.threads, options.requests // options.threads)
+    print(f'{options.threads} threads, one bucket: {rate:,.0f} tokens/s')
+    cache.clear()
+
+    if overhead > options.max_overhead_us:
+        print(f'The throttle takes {overhead:.1f} us per request, over {options.max_overhead_us:.0f} us')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,101 @@
-"""Gunicorn configuration file"""
+"""Gunicorn configuration file
 
+Pick a worker model with GUNICORN_PROFILE:
+
+    sync     one request per process (default, safest for CPU-bound views)
+    gthread  a few processes with a thread pool each (I/O-bound views, less memory)
+    gevent   greenlet workers for many slow/idle connections (pip install gevent)
+    asgi     uvicorn workers serving social_media_api.asgi (pip install uvicorn)
+
+Every tunable below can be overridden with the matching GUNICORN_* variable.
+Run benchmark_gunicorn.py to find the profile that performs best on a host.
+"""
+
+import importlib.util
 import multiprocessing
+import os
+import sys
+
+cpu_count = multiprocessing.cpu_count()
+
+PROFILES = {
+    'sync': {
+        'worker_class': 'sync',
+        'workers': cpu_count * 2 + 1,
+        'threads': 1,
+        'app': 'social_media_api.wsgi:application',
+    },
+    'gthread': {
+        'worker_class': 'gthread',
+        'workers': cpu_count + 1,
+        'threads': 4,
+        'app': 'social_media_api.wsgi:application',
+    },
+    'gevent': {
+        'worker_class': 'gevent',
+        'workers': cpu_count,
+        'threads': 1,
+        'app': 'social_media_api.wsgi:application',
+        'requires': 'gevent',
+    },
+    'asgi': {
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'workers': cpu_count,
+        'threads': 1,
+        'app': 'social_media_api.asgi:application',
+        'requires': 'uvicorn',
+    },
+}
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+profile_name = os.environ.get('GUNICORN_PROFILE', 'sync')
+if profile_name not in PROFILES:
+    raise RuntimeError(f"Unknown GUNICORN_PROFILE {profile_name!r}, choose from {', '.join(PROFILES)}")
+profile = PROFILES[profile_name]
+if 'requires' in profile and importlib.util.find_spec(profile['requires']) is None:
+    raise RuntimeError(f"GUNICORN_PROFILE={profile_name} needs the {profile['requires']!r} package installed")
+
+# Application
+wsgi_app = os.environ.get('GUNICORN_APP', profile['app'])
 
 # Server socket
-bind = "0.0.0.0:8000"
-backlog = 2048
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+backlog = env_int('GUNICORN_BACKLOG', 2048)
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
-worker_connections = 1000
-timeout = 30
-keepalive = 2
+workers = env_int('GUNICORN_WORKERS', profile['workers'])
+worker_class = profile['worker_class']
+threads = env_int('GUNICORN_THREADS', profile['threads'])
+# Only used by the gevent profile; sync and gthread workers ignore it
+worker_connections = env_int('GUNICORN_WORKER_CONNECTIONS', 1000)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 2)
+
+# Recycle workers to bound memory growth; the jitter staggers restarts so
+# workers don't all recycle at the same moment
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Load the application in the master before forking so workers share its
+# memory copy-on-write and boot faster
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+# Import all views/serializers, build the URL resolver and prime the
+# ContentType cache once in the master (or in each worker without preload)
+warmup = env_bool('GUNICORN_WARMUP', True)
 
 # Logging
 accesslog = '-'
 errorlog = '-'
-loglevel = 'info'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
 
 # Process naming
@@ -31,4 +110,37 @@ tmp_upload_dir = None
 
 # SSL (if not using nginx)
 # keyfile = None
-# certfile = None
\ No newline at end of file
+# certfile = None
+
+
+def when_ready(server):
+    if warmup and preload_app:
+        from social_media_api.warmup import warm_up
+        server.log.info('Warmed up application in %.3fs', warm_up())
+
+
+def post_worker_init(worker):
+    if warmup and not preload_app:
+        from social_media_api.warmup import warm_up
+        worker.log.info('Warmed up worker in %.3fs', warm_up())
+
+
+def pre_fork(server, worker):
+    # Don't let workers inherit database sockets opened in the master with preload_app
+    if 'django.db' in sys.modules:
+        from django.db import connections
+        connections.close_all()
+    pooled_backend = sys.modules.get('social_media_api.backends.pooled_postgresql.base')
+    if pooled_backend is not None:
+        pooled_backend.close_pools()
+
+
+def worker_exit(server, worker):
+    # Write likes still queued by the optional like buffer before the worker exits
+    like_buffer = sys.modules.get('posts.like_buffer')
+    if like_buffer is not None:
+        like_buffer.like_buffer.close()
+    # Likewise for profile picture variants still waiting to be rendered
+    media = sys.modules.get('accounts.media')
+    if media is not None:
+        media.variant_worker.close()
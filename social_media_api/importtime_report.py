@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Report how long a worker spends importing the application at boot.
+
+Starts a fresh interpreter with ``python -X importtime``, sets Django up and
+loads the WSGI application (optionally followed by the warm-up), then parses
+the importtime log from stderr. Prints the total import time and the slowest
+modules; with --json it prints one JSON object instead, so boot time can be
+tracked as a metric in CI.
+
+Usage:
+    python importtime_report.py
+    python importtime_report.py --top 30 --sort self
+    python importtime_report.py --warmup --json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# import time:       self [us] |  cumulative | imported package
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+BOOT_SCRIPT = """
+import django
+django.setup()
+from social_media_api.wsgi import application
+"""
+
+WARMUP_SCRIPT = """
+from social_media_api.warmup import warm_up
+warm_up()
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output into a list of dicts with module, self_us,
+    cumulative_us and depth (0 for top-level imports).
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                'module': module,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': (len(indent) - 1) // 2,
+            })
+    return entries
+
+
+def run_boot(settings_module, warmup):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    script = BOOT_SCRIPT + (WARMUP_SCRIPT if warmup else '')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(result.returncode)
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'social_media_api.settings'))
+    parser.add_argument('--top', type=int, default=20, help='Number of modules to list (default: 20)')
+    parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+    parser.add_argument('--warmup', action='store_true', help='Also run social_media_api.warmup.warm_up()')
+    parser.add_argument('--json', action='store_true', help='Print a JSON summary instead of a table')
+    args = parser.parse_args()
+
+    entries = run_boot(args.settings, args.warmup)
+    total_us = sum(entry['cumulative_us'] for entry in entries if entry['depth'] == 0)
+    key = 'cumulative_us' if args.sort == 'cumulative' else 'self_us'
+    slowest = sorted(entries, key=lambda entry: entry[key], reverse=True)[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            'total_import_ms': round(total_us / 1000, 1),
+            'modules_imported': len(entries),
+            'slowest': [
+                {'module': e['module'], 'self_ms': round(e['self_us'] / 1000, 2),
+                 'cumulative_ms': round(e['cumulative_us'] / 1000, 2)}
+                for e in slowest
+            ],
+        }))
+        return
+
+    print(f'Imported {len(entries)} modules in {total_us / 1000:.1f} ms')
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for entry in slowest:
+        print(f"{entry['cumulative_us'] / 1000:>14.1f}{entry['self_us'] / 1000:>10.1f}  {entry['module']}")
+
+
+if __name__ == '__main__':
+    main()
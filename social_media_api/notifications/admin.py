@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, ArchivedNotification
 
 
 @admin.register(Notification)
@@ -7,4 +7,9 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ['recipient', 'actor', 'verb', 'timestamp', 'read']
     list_filter = ['read', 'timestamp', 'verb']
     search_fields = ['recipient__username', 'actor__username', 'verb']
-    date_hierarchy = 'timestamp'
\ No newline at end of file
+    date_hierarchy = 'timestamp'
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'actor', 'verb', 'timestamp', 'archived_at']
+    search_fields = ['recipient__username', 'actor__username', 'verb']
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.retention import NOTIFICATION_RETENTION_DAYS, expired_notifications, prune_notifications
+
+
+class Command(BaseCommand):
+    help = 'Archive or delete read notifications older than the retention period, in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=NOTIFICATION_RETENTION_DAYS,
+                            help=f'Keep read notifications newer than this many days (default: {NOTIFICATION_RETENTION_DAYS})')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows handled per transaction (default: 1000)')
+        parser.add_argument('--no-archive', action='store_true',
+                            help='Delete rows without copying them to the archive table')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between batches (default: 0)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be pruned')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = expired_notifications(options['days']).count()
+            self.stdout.write(f'{count} read notifications older than {options["days"]} days would be pruned')
+            return
+
+        action = 'Deleted' if options['no_archive'] else 'Archived'
+        started = time.monotonic()
+        total = 0
+        for handled in prune_notifications(days=options['days'], batch_size=options['batch_size'],
+                                           archive=not options['no_archive'], pause=options['pause']):
+            total += handled
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{action} {total} notifications so far')
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {total} notifications in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
@@ -18,6 +18,35 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Serves the unread count and bulk mark-read updates
+            models.Index(fields=['recipient', 'read'], name='notif_recipient_read_idx'),
+            # Lets the retention command find old read rows without a full scan
+            models.Index(fields=['read', 'timestamp'], name='notif_read_timestamp_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.actor.username} {self.verb}'
\ No newline at end of file
+        return f'{self.actor.username} {self.verb}'
+
+
+class ArchivedNotification(models.Model):
+    """
+    Read notification moved out of Notification by the prune_notifications command.
+
+    Keeps the original id and timestamp but only the columns needed for audit,
+    so the live table stays small.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    verb = models.CharField(max_length=255)
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    target_object_id = models.PositiveIntegerField(null=True, blank=True)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+
+    def __str__(self):
+        return f'{self.actor_id} {self.verb} (archived)'
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Retention policy for read notifications.
+
+Old read notifications are removed from the live table in small batches,
+each in its own short transaction, so the table never sees a long-running
+lock. Rows can optionally be copied to ArchivedNotification first.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+NOTIFICATION_RETENTION_DAYS = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+
+ARCHIVED_FIELDS = ['id', 'recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id', 'timestamp']
+
+
+def expired_notifications(days=NOTIFICATION_RETENTION_DAYS):
+    cutoff = timezone.now() - timedelta(days=days)
+    return Notification.objects.filter(read=True, timestamp__lt=cutoff)
+
+
+def prune_notifications(days=NOTIFICATION_RETENTION_DAYS, batch_size=1000, archive=True, pause=0.0):
+    """
+    Delete (and optionally archive) read notifications older than days.
+
+    Yields the number of rows handled per batch so callers can report
+    progress. pause sleeps between batches to leave room for other writers.
+    """
+    queryset = expired_notifications(days).order_by('pk')
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.filter(pk__gt=last_pk).values(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                return
+            ids = [row['id'] for row in rows]
+            if archive:
+                ArchivedNotification.objects.bulk_create(
+                    [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+                )
+            Notification.objects.filter(pk__in=ids).delete()
+        last_pk = ids[-1]
+        yield len(rows)
+        if pause:
+            time.sleep(pause)
@@ -5,9 +5,39 @@ from .models import Notification
 class NotificationSerializer(serializers.ModelSerializer):
     actor_username = serializers.CharField(source='actor.username', read_only=True)
     recipient_username = serializers.CharField(source='recipient.username', read_only=True)
+    target = serializers.SerializerMethodField()
     
     class Meta:
         model = Notification
         fields = ['id', 'recipient', 'recipient_username', 'actor', 'actor_username', 
-                  'verb', 'target_content_type', 'target_object_id', 'timestamp', 'read']
-        read_only_fields = ['id', 'recipient', 'actor', 'timestamp']
\ No newline at end of file
+                  'verb', 'target_content_type', 'target_object_id', 'target', 'timestamp', 'read']
+        read_only_fields = ['id', 'recipient', 'actor', 'timestamp']
+
+    def get_target(self, obj):
+        """
+        Compact summary of the target (e.g. the post title), or None if it is
+        unset or has been deleted. Relies on the view prefetching 'target' so
+        rendering a page does not query once per row.
+        """
+        target = obj.target
+        if target is None:
+            return None
+        return {
+            'type': obj.target_content_type.model,
+            'id': target.pk,
+            'display': str(target),
+        }
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """
+    Selects notifications to mark as read: an explicit list of ids, or every
+    notification up to and including the "before" timestamp.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), max_length=500, required=False)
+    before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('before' in attrs):
+            raise serializers.ValidationError('Provide either "ids" or "before".')
+        return attrs
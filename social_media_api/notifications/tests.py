@@ -0,0 +1,185 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Post
+
+from .models import ArchivedNotification, Notification
+from .retention import prune_notifications
+
+User = get_user_model()
+
+
+class PruneNotificationsTestCase(TestCase):
+    """
+    Only read notifications past the retention period are archived and
+    deleted, in batches; a dry run changes nothing.
+    """
+
+    def setUp(self):
+        self.recipient = User.objects.create_user(username='recipient', password='testpass123')
+        self.actor = User.objects.create_user(username='actor', password='testpass123')
+        old = timezone.now() - timedelta(days=100)
+        self.expired = self.create(5, read=True, timestamp=old)
+        self.unread_old = self.create(1, read=False, timestamp=old)
+        self.read_recent = self.create(1, read=True)
+
+    def create(self, count, read, timestamp=None):
+        notifications = [
+            Notification.objects.create(recipient=self.recipient, actor=self.actor, verb='liked your post', read=read)
+            for _ in range(count)
+        ]
+        if timestamp:
+            # timestamp is auto_now_add, so it can only be backdated by an update
+            Notification.objects.filter(pk__in=[n.pk for n in notifications]).update(timestamp=timestamp)
+        return [n.pk for n in notifications]
+
+    def prune(self, *args):
+        stdout = io.StringIO()
+        call_command('prune_notifications', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        output = self.prune('--dry-run')
+        self.assertIn('5 read notifications older than 90 days would be pruned', output)
+        self.assertEqual(Notification.objects.count(), 7)
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+    def test_prune_archives_expired_rows_in_batches(self):
+        self.assertEqual(list(prune_notifications(batch_size=2)), [2, 2, 1])
+        self.assertEqual(
+            sorted(Notification.objects.values_list('pk', flat=True)),
+            self.unread_old + self.read_recent,
+        )
+        archived = ArchivedNotification.objects.get(pk=self.expired[0])
+        self.assertEqual((archived.recipient, archived.actor, archived.verb), (self.recipient, self.actor, 'liked your post'))
+        self.assertEqual(ArchivedNotification.objects.count(), 5)
+
+    def test_prune_without_archive(self):
+        self.assertIn('Deleted 5 notifications', self.prune('--no-archive'))
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertFalse(ArchivedNotification.objects.exists())
+        self.assertIn('Deleted 1 notifications', self.prune('--no-archive', '--days', '0'))
+        self.assertEqual(list(Notification.objects.values_list('pk', flat=True)), self.unread_old)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class MarkReadTestCase(TestCase):
+    """
+    Notifications are marked read one at a time, by id list or up to a
+    timestamp, and only ever the requesting user's own.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='recipient', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.notifications = [
+            Notification.objects.create(recipient=self.user, actor=self.other, verb=f'event {i}') for i in range(4)
+        ]
+        base = timezone.now() - timedelta(hours=1)
+        for minutes, notification in enumerate(self.notifications):
+            notification.timestamp = base + timedelta(minutes=minutes)
+            Notification.objects.filter(pk=notification.pk).update(timestamp=notification.timestamp)
+        self.foreign = Notification.objects.create(recipient=self.other, actor=self.user, verb='event')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread(self):
+        return sorted(Notification.objects.filter(read=False).values_list('pk', flat=True))
+
+    def test_mark_one_read(self):
+        response = self.client.post(f'/api/notifications/{self.notifications[0].pk}/read/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post(f'/api/notifications/{self.foreign.pk}/read/').status_code, 404)
+        self.assertEqual(self.unread(), [n.pk for n in self.notifications[1:]] + [self.foreign.pk])
+        self.assertEqual(self.client.get('/api/notifications/unread-count/').data, {'unread_count': 3})
+
+    def test_mark_read_by_ids(self):
+        ids = [self.notifications[0].pk, self.notifications[2].pk, self.foreign.pk]
+        response = self.client.post('/api/notifications/read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'updated': 2, 'unread_count': 2})
+        # Already read: nothing left to update
+        response = self.client.post('/api/notifications/read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'updated': 0, 'unread_count': 2})
+        self.assertIn(self.foreign.pk, self.unread())
+
+    def test_mark_read_before_timestamp(self):
+        before = self.notifications[1].timestamp.isoformat()
+        response = self.client.post('/api/notifications/read/', {'before': before}, format='json')
+        self.assertEqual(response.data, {'updated': 2, 'unread_count': 2})
+        self.assertEqual(self.unread(), [n.pk for n in self.notifications[2:]] + [self.foreign.pk])
+
+    def test_mark_read_needs_exactly_one_selector(self):
+        for data in ({}, {'ids': [1], 'before': timezone.now().isoformat()}, {'ids': list(range(501))}):
+            with self.subTest(data=list(data)):
+                self.assertEqual(self.client.post('/api/notifications/read/', data, format='json').status_code, 400)
+        self.assertEqual(len(self.unread()), 5)
+
+    def test_mark_all_read(self):
+        self.assertEqual(self.client.post('/api/notifications/read-all/').status_code, 200)
+        self.assertEqual(self.unread(), [self.foreign.pk])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NotificationListTestCase(TestCase):
+    """
+    The list summarises each target and loads the targets of a page with
+    one query per target type, however many notifications it shows.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='recipient', password='testpass123')
+        self.actor = User.objects.create_user(username='actor', password='testpass123')
+        self.post = Post.objects.create(author=self.user, title='First post', content='content')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, target, verb='liked your post'):
+        return Notification.objects.create(recipient=self.user, actor=self.actor, verb=verb, target=target)
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/notifications/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_target_summary(self):
+        comment = Comment.objects.create(post=self.post, author=self.actor, content='Nice')
+        self.notify(self.post)
+        self.notify(comment, verb='commented on your post')
+        Notification.objects.create(recipient=self.user, actor=self.actor, verb='started following you')
+
+        targets = [notification['target'] for notification in self.list_queries()[0].data['results']]
+        self.assertEqual(targets, [
+            None,
+            {'type': 'comment', 'id': comment.pk, 'display': str(comment)},
+            {'type': 'post', 'id': self.post.pk, 'display': str(self.post)},
+        ])
+
+    def test_deleted_target_is_none(self):
+        other = Post.objects.create(author=self.user, title='Deleted', content='content')
+        notification = self.notify(other)
+        other.delete()
+        result = self.list_queries()[0].data['results'][0]
+        self.assertEqual((result['id'], result['target']), (notification.pk, None))
+        self.assertEqual(result['target_content_type'], ContentType.objects.get_for_model(Post).pk)
+
+    def test_queries_do_not_grow_with_the_page(self):
+        self.notify(self.post)
+        _, few = self.list_queries()
+        for i in range(8):
+            post = Post.objects.create(author=self.user, title=f'Post {i}', content='content')
+            self.notify(post)
+            self.notify(Comment.objects.create(post=post, author=self.actor, content='Nice'))
+        response, many = self.list_queries()
+        self.assertEqual(len(response.data['results']), 10)
+        # Comments add their target query and one each for their authors and posts
+        self.assertEqual(many, few + 3)
@@ -1,8 +1,10 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from posts.models import Comment
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, MarkReadSerializer
 
 
 class NotificationListView(generics.ListAPIView):
@@ -14,8 +16,23 @@ class NotificationListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        # Return notifications for the current user, ordered by timestamp (newest first)
-        return Notification.objects.filter(recipient=self.request.user).order_by('-timestamp')
+        # Return notifications for the current user, ordered by timestamp (newest first).
+        # Targets are prefetched with one query per target content type.
+        return (
+            Notification.objects
+            .filter(recipient=self.request.user)
+            .select_related('actor', 'recipient', 'target_content_type')
+            .prefetch_related('target')
+            .order_by('-timestamp')
+        )
+
+    def paginate_queryset(self, queryset):
+        notifications = super().paginate_queryset(queryset)
+        # A comment's summary names its author and post: load them for the
+        # whole page at once
+        comments = [n.target for n in notifications or [] if isinstance(n.target, Comment)]
+        prefetch_related_objects(comments, 'author', 'post')
+        return notifications
 
 
 @api_view(['POST'])
@@ -24,19 +41,42 @@ def mark_notification_read(request, notification_id):
     """
     Mark a specific notification as read
     """
-    try:
-        notification = Notification.objects.get(id=notification_id, recipient=request.user)
-        notification.read = True
-        notification.save()
-        return Response(
-            {'message': 'Notification marked as read'},
-            status=status.HTTP_200_OK
-        )
-    except Notification.DoesNotExist:
+    if not Notification.objects.filter(id=notification_id, recipient=request.user).update(read=True):
         return Response(
             {'error': 'Notification not found'},
             status=status.HTTP_404_NOT_FOUND
         )
+    return Response(
+        {'message': 'Notification marked as read'},
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def mark_notifications_read(request):
+    """
+    Mark several notifications as read in one UPDATE, either by id
+    ({"ids": [1, 2, 3]}) or up to a timestamp ({"before": "<datetime>"}).
+    Returns the number updated and the new unread count.
+    """
+    serializer = MarkReadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    unread = Notification.objects.filter(recipient=request.user, read=False)
+    if 'ids' in serializer.validated_data:
+        selected = unread.filter(id__in=serializer.validated_data['ids'])
+    else:
+        selected = unread.filter(timestamp__lte=serializer.validated_data['before'])
+    updated = selected.update(read=True)
+    
+    return Response(
+        {
+            'updated': updated,
+            'unread_count': unread.count()
+        },
+        status=status.HTTP_200_OK
+    )
 
 
 @api_view(['POST'])
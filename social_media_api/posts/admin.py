@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Comment
+from .models import Post, Comment, TrendingPost
 
 
 @admin.register(Post)
@@ -15,4 +15,9 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ['post', 'author', 'created_at', 'updated_at']
     list_filter = ['created_at', 'updated_at', 'author']
     search_fields = ['content', 'author__username', 'post__title']
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    date_hierarchy = 'created_at'
+
+
+@admin.register(TrendingPost)
+class TrendingPostAdmin(admin.ModelAdmin):
+    list_display = ['rank', 'post', 'score', 'computed_at']
@@ -0,0 +1,165 @@
+"""
+Optional write-behind buffer for likes.
+
+With LIKE_BUFFER_ENABLED = True, like requests only record (user_id, post_id)
+in a per-process buffer. A background thread hands the buffer to
+posts.likes.apply_like_batch every LIKE_BUFFER_FLUSH_INTERVAL seconds, or
+sooner once LIKE_BUFFER_MAX_SIZE likes are waiting, so a burst of likes on
+one post becomes one INSERT and one counter UPDATE instead of a transaction
+per request. The buffer is flushed at interpreter exit, which covers a
+graceful worker shutdown.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404
+
+from .likes import apply_like_batch
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+LIKE_BUFFER_MAX_SIZE = getattr(settings, 'LIKE_BUFFER_MAX_SIZE', 1000)
+LIKE_BUFFER_FLUSH_INTERVAL = getattr(settings, 'LIKE_BUFFER_FLUSH_INTERVAL', 1.0)
+
+
+class LikeBuffer:
+    """
+    Thread-safe set of pending likes with a lazily started flusher thread.
+    """
+
+    def __init__(self, max_size=LIKE_BUFFER_MAX_SIZE, interval=LIKE_BUFFER_FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.interval = interval
+        self._pending = set()
+        self._pending_per_post = Counter()
+        # Likes taken by the running flush, until they are written or put back
+        self._flushing = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def add(self, user_id, post_id):
+        """
+        Queue a like. Returns the number of likes queued for post_id.
+        """
+        with self._lock:
+            if (user_id, post_id) not in self._pending:
+                self._pending.add((user_id, post_id))
+                self._pending_per_post[post_id] += 1
+            queued = self._pending_per_post[post_id]
+            full = len(self._pending) >= self.max_size
+            self._start()
+        if full:
+            self._wake.set()
+        return queued
+
+    def discard(self, user_id, post_id):
+        """
+        Drop a queued like. Returns True if it was still waiting in the buffer.
+
+        A like that is being flushed cannot be taken back, so this waits for
+        the flush to finish; the like is then in the database (or back in the
+        buffer if the write failed).
+        """
+        while True:
+            with self._lock:
+                if (user_id, post_id) in self._pending:
+                    self._pending.remove((user_id, post_id))
+                    self._pending_per_post[post_id] -= 1
+                    return True
+                if (user_id, post_id) not in self._flushing:
+                    return False
+            with self._flush_lock:
+                pass
+
+    def queued_for(self, post_id):
+        with self._lock:
+            return self._pending_per_post[post_id]
+
+    def flush(self):
+        """
+        Write every queued like. Returns the number of likes created.
+
+        If the write fails the likes go back into the buffer for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pairs, self._pending = self._pending, set()
+                self._pending_per_post = Counter()
+                self._flushing = pairs
+            if not pairs:
+                return 0
+            try:
+                return apply_like_batch(pairs)
+            except Exception:
+                with self._lock:
+                    for user_id, post_id in pairs - self._pending:
+                        self._pending.add((user_id, post_id))
+                        self._pending_per_post[post_id] += 1
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = set()
+
+    def close(self):
+        """
+        Stop the flusher thread and write whatever is still queued.
+        """
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _start(self):
+        # Called with self._lock held. Started on first use so a buffer
+        # created before a fork (gunicorn preload_app) runs in each worker.
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='like-buffer-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush buffered likes')
+            finally:
+                close_old_connections()
+
+
+like_buffer = LikeBuffer()
+atexit.register(like_buffer.close)
+
+
+def queue_like(user, post_id):
+    """
+    Queue user's like of post_id. Returns the estimated like count (stored
+    count plus likes still queued), or raises Http404 for an unknown post.
+    """
+    likes_count = Post.objects.filter(pk=post_id).values_list('likes_count', flat=True).first()
+    if likes_count is None:
+        raise Http404('No Post matches the given query.')
+    return likes_count + like_buffer.add(user.pk, post_id)
+
+
+def unqueue_like(user, post_id):
+    """
+    Drop user's queued like of post_id. Returns the estimated like count, or
+    None if the like was not queued (it may already be in the database).
+    """
+    if not like_buffer.discard(user.pk, post_id):
+        return None
+    likes_count = Post.objects.filter(pk=post_id).values_list('likes_count', flat=True).first() or 0
+    return likes_count + like_buffer.queued_for(post_id)
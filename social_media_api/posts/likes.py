@@ -0,0 +1,213 @@
+"""
+Like writes that keep Post.likes_count in step with the Like table.
+
+Adding a like is a single INSERT ... ON CONFLICT DO NOTHING whose rowcount
+says whether the like is new, and removing one is a single DELETE whose
+rowcount says whether it existed. The counter is then moved by that rowcount
+with an UPDATE ... RETURNING, so a double-tap never double counts, never
+races a get_or_create, and the new count comes back without another query.
+"""
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Like, Post
+from .trending import TRENDING_LIKE_WEIGHT, record_activity, record_like, record_unlike
+
+# Likes per multi-row INSERT, 3 parameters each: below SQLite's 999 variables
+LIKE_INSERT_BATCH_SIZE = 300
+
+
+def _supports_returning():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _insert_like(user_id, post_id):
+    """
+    Insert the (user, post) like unless it exists. Returns 1 if inserted, else 0.
+    """
+    qn = connection.ops.quote_name
+    table = qn(Like._meta.db_table)
+    columns = ', '.join(qn(Like._meta.get_field(name).column) for name in ('user', 'post', 'created_at'))
+    if connection.vendor == 'mysql':
+        sql = f'INSERT IGNORE INTO {table} ({columns}) VALUES (%s, %s, %s)'
+    else:
+        sql = f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING'
+    created_at = Like._meta.get_field('created_at').get_db_prep_value(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, post_id, created_at])
+        return cursor.rowcount
+
+
+def _insert_likes(pairs):
+    """
+    Insert the (user_id, post_id) likes that do not exist yet. Returns the
+    pairs that were inserted, as reported by the database.
+    """
+    if not _supports_returning():
+        return [(user_id, post_id) for user_id, post_id in pairs if _insert_like(user_id, post_id)]
+    qn = connection.ops.quote_name
+    table = qn(Like._meta.db_table)
+    user_column, post_column, created_column = (
+        qn(Like._meta.get_field(name).column) for name in ('user', 'post', 'created_at')
+    )
+    created_at = Like._meta.get_field('created_at').get_db_prep_value(timezone.now(), connection)
+    inserted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(pairs), LIKE_INSERT_BATCH_SIZE):
+            batch = pairs[start:start + LIKE_INSERT_BATCH_SIZE]
+            values = ', '.join(['(%s, %s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} ({user_column}, {post_column}, {created_column}) VALUES {values} '
+                f'ON CONFLICT DO NOTHING RETURNING {user_column}, {post_column}',
+                [value for user_id, post_id in batch for value in (user_id, post_id, created_at)],
+            )
+            inserted += cursor.fetchall()
+    return inserted
+
+
+def _move_likes_count(post_id, delta):
+    """
+    Add delta to the post's likes_count. Returns (likes_count, author_id),
+    or raises Http404 if the post does not exist.
+    """
+    if _supports_returning():
+        qn = connection.ops.quote_name
+        table = qn(Post._meta.db_table)
+        count_column = qn(Post._meta.get_field('likes_count').column)
+        author_column = qn(Post._meta.get_field('author').column)
+        pk_column = qn(Post._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET {count_column} = {count_column} + %s '
+                f'WHERE {pk_column} = %s RETURNING {count_column}, {author_column}',
+                [delta, post_id],
+            )
+            row = cursor.fetchone()
+    else:
+        Post.objects.filter(pk=post_id).update(likes_count=F('likes_count') + delta)
+        row = Post.objects.filter(pk=post_id).values_list('likes_count', 'author_id').first()
+    if row is None:
+        raise Http404('No Post matches the given query.')
+    return row
+
+
+def _notify_like(post_id, author_id, user):
+    if author_id != user.pk:
+        from notifications.models import Notification
+        Notification.objects.create(
+            recipient_id=author_id,
+            actor=user,
+            verb='liked your post',
+            target_content_type=ContentType.objects.get_for_model(Post),
+            target_object_id=post_id,
+        )
+
+
+def _apply_like(user, post_id, liked):
+    """
+    Set (liked=True/False) or flip (liked=None) user's like of post_id.
+    Returns (delta, likes_count) where delta is +1, -1 or 0 for no change.
+    """
+    with transaction.atomic():
+        if liked:
+            delta = _insert_like(user.pk, post_id)
+        else:
+            deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+            delta = -deleted
+            if liked is None and not deleted:
+                delta = _insert_like(user.pk, post_id)
+        likes_count, author_id = _move_likes_count(post_id, delta)
+        if delta > 0:
+            _notify_like(post_id, author_id, user)
+    if delta > 0:
+        record_like(post_id)
+    elif delta < 0:
+        record_unlike(post_id)
+    return delta, likes_count
+
+
+def add_like(user, post_id):
+    """
+    Like post_id as user. Returns (created, likes_count).
+    """
+    delta, likes_count = _apply_like(user, post_id, liked=True)
+    return delta > 0, likes_count
+
+
+def remove_like(user, post_id):
+    """
+    Remove user's like of post_id. Returns (deleted, likes_count).
+    """
+    delta, likes_count = _apply_like(user, post_id, liked=False)
+    return delta < 0, likes_count
+
+
+def toggle_like(user, post_id, liked=None):
+    """
+    Set user's like of post_id to liked, or flip it when liked is None.
+    Returns (liked, likes_count).
+    """
+    delta, likes_count = _apply_like(user, post_id, liked)
+    if delta:
+        return delta > 0, likes_count
+    # No change: the like was already in the requested state, or a
+    # concurrent request inserted it between our DELETE and INSERT
+    return liked is not False, likes_count
+
+
+def apply_like_batch(pairs):
+    """
+    Write a batch of (user_id, post_id) likes, as flushed by posts.like_buffer.
+
+    Likes of deleted posts are skipped and the rest go in with one
+    INSERT ... ON CONFLICT DO NOTHING RETURNING per LIKE_INSERT_BATCH_SIZE
+    likes. Counters and notifications follow only the rows the database
+    reports as inserted, so a like that already exists, or that another
+    worker's buffer writes at the same time, is never counted twice. Each
+    post's counter moves with one UPDATE. Returns the number of likes created.
+    """
+    from notifications.models import Notification
+
+    pairs = set(pairs)
+    post_ids = {post_id for _, post_id in pairs}
+    with transaction.atomic():
+        authors = dict(Post.objects.filter(pk__in=post_ids).values_list('pk', 'author_id'))
+        # Sorted so that concurrent batches take row locks in the same order
+        new = _insert_likes(sorted(pair for pair in pairs if pair[1] in authors))
+        created_per_post = Counter(post_id for _, post_id in new)
+        for post_id, created in created_per_post.items():
+            Post.objects.filter(pk=post_id).update(likes_count=F('likes_count') + created)
+
+        post_type = ContentType.objects.get_for_model(Post)
+        Notification.objects.bulk_create([
+            Notification(recipient_id=authors[post_id], actor_id=user_id, verb='liked your post',
+                         target_content_type=post_type, target_object_id=post_id)
+            for user_id, post_id in new if authors[post_id] != user_id
+        ])
+    for post_id, created in created_per_post.items():
+        record_activity(post_id, TRENDING_LIKE_WEIGHT * created)
+    return len(new)
+
+
+def recount_likes():
+    """
+    Recompute every Post.likes_count from the Like table. Returns the number of posts updated.
+    """
+    counts = (
+        Like.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Post.objects.update(likes_count=Coalesce(Subquery(counts), 0))
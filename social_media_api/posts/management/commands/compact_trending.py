@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import TRENDING_SIZE, compact
+
+
+class Command(BaseCommand):
+    help = 'Decay trending scores to now, prune cold posts and rebuild the top-K trending table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=TRENDING_SIZE,
+                            help=f'Number of posts kept in the trending table (default: {TRENDING_SIZE})')
+        parser.add_argument('--min-score', type=float, default=0.01,
+                            help='Scores below this are deleted (default: 0.01)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        kept, pruned = compact(size=options['size'], min_score=options['min_score'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Kept {kept} scores, pruned {pruned}, rebuilt trending table in {elapsed:.2f}s'
+        ))
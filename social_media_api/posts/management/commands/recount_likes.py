@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.likes import recount_likes
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized Post.likes_count from the Like table'
+
+    def handle(self, *args, **options):
+        updated = recount_likes()
+        self.stdout.write(self.style.SUCCESS(f'Recounted likes for {updated} posts'))
@@ -10,6 +10,8 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized number of Like rows, maintained by posts.likes
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-created_at']
@@ -42,4 +44,39 @@ class Like(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f'{self.user.username} likes {self.post.title}'
\ No newline at end of file
+        return f'{self.user.username} likes {self.post.title}'
+
+class PostScore(models.Model):
+    """
+    Exponentially time-decayed activity score of a post (see posts.trending).
+
+    score is the decayed value as of scored_at, stored as a unix timestamp so
+    the decay can be applied inside a single UPDATE.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='score')
+    score = models.FloatField(default=0.0)
+    scored_at = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='posts_postscore_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.3f}'
+
+
+class TrendingPost(models.Model):
+    """
+    Top-K snapshot of PostScore written by the compact_trending command.
+    """
+    rank = models.PositiveIntegerField(primary_key=True)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['rank']
+
+    def __str__(self):
+        return f'#{self.rank} {self.post_id}'
@@ -43,9 +43,14 @@ class PostSerializer(serializers.ModelSerializer):
         return obj.comments.count()
 
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
 
     def get_liked_by_user(self, obj):
+        # Views listing many posts look up the user's likes of all of them
+        # in one query and pass the liked ids in the context
+        liked_post_ids = self.context.get('liked_post_ids')
+        if liked_post_ids is not None:
+            return obj.pk in liked_post_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
@@ -0,0 +1,346 @@
+import io
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from notifications.models import Notification
+from . import like_buffer, likes, trending, views
+from .like_buffer import LikeBuffer
+from .models import Like, Post, PostScore, TrendingPost
+
+User = get_user_model()
+
+
+class LikeBufferTestCase(TransactionTestCase):
+    """
+    The write-behind like buffer must end up with exactly the likes, counters
+    and notifications that direct writes would have produced, however many
+    threads queue likes at once.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(20)
+        ]
+        self.posts = [
+            Post.objects.create(author=self.author, title=f'Post {i}', content='content') for i in range(5)
+        ]
+
+    def test_concurrent_likes_are_flushed_exactly_once(self):
+        buffer = LikeBuffer(max_size=25, interval=0.01)
+        users = self.users + [self.author]
+        # The author already likes the first post: the buffer must not count it twice
+        Like.objects.create(user=self.author, post=self.posts[0])
+        Post.objects.filter(pk=self.posts[0].pk).update(likes_count=1)
+
+        def like_everything():
+            # Every thread likes every post, so each pair is queued many times
+            for user in users:
+                for post in self.posts:
+                    buffer.add(user.pk, post.pk)
+
+        threads = [threading.Thread(target=like_everything) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        buffer.close()
+
+        self.assertEqual(Like.objects.count(), len(users) * len(self.posts))
+        for post in Post.objects.all():
+            self.assertEqual(post.likes_count, len(users))
+            self.assertEqual(post.likes.count(), len(users))
+        # One notification per new like, none for the author's own likes
+        self.assertEqual(Notification.objects.count(), len(self.users) * len(self.posts))
+
+    def test_discarded_like_is_not_written(self):
+        buffer = LikeBuffer(max_size=100, interval=60)
+        buffer.add(self.users[0].pk, self.posts[0].pk)
+        buffer.add(self.users[1].pk, self.posts[0].pk)
+
+        self.assertTrue(buffer.discard(self.users[0].pk, self.posts[0].pk))
+        self.assertFalse(buffer.discard(self.users[0].pk, self.posts[0].pk))
+        buffer.close()
+
+        self.assertEqual(list(Like.objects.values_list('user_id', flat=True)), [self.users[1].pk])
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).likes_count, 1)
+
+    def test_buffers_of_two_workers_flush_the_same_like(self):
+        first, second = LikeBuffer(max_size=100, interval=60), LikeBuffer(max_size=100, interval=60)
+        user, post = self.users[0], self.posts[0]
+        first.add(user.pk, post.pk)
+        second.add(user.pk, post.pk)
+        insert_likes = likes._insert_likes
+
+        def insert_after_other_worker(pairs):
+            # The other worker commits the same like while this batch is being written
+            if not second._flushing:
+                second.flush()
+            return insert_likes(pairs)
+
+        with mock.patch.object(likes, '_insert_likes', insert_after_other_worker):
+            self.assertEqual(first.flush(), 0)
+        first.close()
+        second.close()
+
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).likes_count, 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+@mock.patch('posts.views.LIKE_BUFFER_ENABLED', True)
+class BufferedLikeViewsTestCase(TransactionTestCase):
+    """
+    With LIKE_BUFFER_ENABLED, unliking and toggling see likes that are still
+    queued or being flushed.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.buffer = LikeBuffer(max_size=100, interval=60)
+        patcher = mock.patch.object(like_buffer, 'like_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.buffer.close)
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Post', content='content')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_toggle_takes_back_queued_like(self):
+        response = self.client.post(f'/api/posts/{self.post.pk}/like/')
+        self.assertEqual((response.status_code, response.data['likes_count']), (202, 1))
+
+        response = self.client.post(f'/api/posts/{self.post.pk}/like/toggle/')
+        self.assertEqual(response.data, {'liked': False, 'likes_count': 0})
+
+        self.buffer.flush()
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes_count, 0)
+
+    def test_unlike_waits_for_running_flush(self):
+        self.client.post(f'/api/posts/{self.post.pk}/like/')
+        writing, release = threading.Event(), threading.Event()
+        apply_like_batch = like_buffer.apply_like_batch
+
+        def slow_apply(pairs):
+            writing.set()
+            release.wait(5)
+            return apply_like_batch(pairs)
+
+        with mock.patch.object(like_buffer, 'apply_like_batch', slow_apply):
+            flush = threading.Thread(target=self.buffer.flush)
+            flush.start()
+            writing.wait(5)
+            # The like has left the buffer but is not in the database yet
+            threading.Timer(0.2, release.set).start()
+            response = self.client.post(f'/api/posts/{self.post.pk}/unlike/')
+            flush.join()
+
+        self.assertEqual(response.data, {'message': 'Post unliked successfully', 'likes_count': 0})
+        self.assertFalse(Like.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LikeCounterTestCase(TestCase):
+    """
+    Likes, unlikes and toggles move Post.likes_count by exactly the rows
+    they insert or delete; recount_likes() repairs a drifted counter.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Post', content='content')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def likes_count(self):
+        return Post.objects.get(pk=self.post.pk).likes_count
+
+    def test_insert_like_reports_new_rows(self):
+        self.assertEqual(likes._insert_like(self.user.pk, self.post.pk), 1)
+        self.assertEqual(likes._insert_like(self.user.pk, self.post.pk), 0)
+        self.assertEqual(Like.objects.count(), 1)
+
+    def test_move_likes_count(self):
+        for supports_returning in (True, False):
+            with self.subTest(supports_returning=supports_returning):
+                with mock.patch.object(likes, '_supports_returning', lambda: supports_returning):
+                    start = self.likes_count()
+                    self.assertEqual(likes._move_likes_count(self.post.pk, 2), (start + 2, self.author.pk))
+                    self.assertEqual(likes._move_likes_count(self.post.pk, -1), (start + 1, self.author.pk))
+                    with self.assertRaises(Http404):
+                        likes._move_likes_count(self.post.pk + 100, 1)
+
+    def test_like_and_unlike_are_counted_once(self):
+        url = f'/api/posts/{self.post.pk}'
+        response = self.client.post(f'{url}/like/')
+        self.assertEqual((response.status_code, response.data['likes_count']), (201, 1))
+        self.assertEqual(self.client.post(f'{url}/like/').status_code, 400)
+        self.assertEqual(self.likes_count(), 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 1)
+
+        response = self.client.post(f'{url}/unlike/')
+        self.assertEqual((response.status_code, response.data['likes_count']), (200, 0))
+        self.assertEqual(self.client.post(f'{url}/unlike/').status_code, 400)
+        self.assertEqual(self.likes_count(), 0)
+        self.assertEqual(self.client.post(f'/api/posts/{self.post.pk + 100}/like/').status_code, 404)
+
+    def test_toggle(self):
+        url = f'/api/posts/{self.post.pk}/like/toggle/'
+        self.assertEqual(self.client.post(url).data, {'liked': True, 'likes_count': 1})
+        self.assertEqual(self.client.post(url).data, {'liked': False, 'likes_count': 0})
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'liked': True}, format='json').data, {'liked': True, 'likes_count': 1})
+        self.assertEqual(self.client.post(url, {'liked': 'yes'}, format='json').status_code, 400)
+        self.assertEqual(self.likes_count(), 1)
+
+        # Liking one's own post counts but does not notify
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.post(url).data, {'liked': True, 'likes_count': 2})
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_recount_likes(self):
+        other = Post.objects.create(author=self.author, title='Other', content='content')
+        likes.add_like(self.user, self.post.pk)
+        likes.add_like(self.author, self.post.pk)
+        Post.objects.update(likes_count=7)
+
+        call_command('recount_likes', stdout=io.StringIO())
+        self.assertEqual(self.likes_count(), 2)
+        self.assertEqual(Post.objects.get(pk=other.pk).likes_count, 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LikeStateTestCase(TestCase):
+    """
+    like-state reports which of the requested posts the user has liked and
+    the like counts of those that exist; bad or oversized id lists are 400.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.posts = [
+            Post.objects.create(author=self.author, title=f'Post {i}', content='content') for i in range(3)
+        ]
+        likes.add_like(self.user, self.posts[0].pk)
+        likes.add_like(self.author, self.posts[0].pk)
+        likes.add_like(self.author, self.posts[2].pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def like_state(self, ids):
+        return self.client.get('/api/posts/like-state/', {'ids': ids})
+
+    def test_liked_subset_and_counts(self):
+        missing = self.posts[-1].pk + 100
+        ids = ','.join(str(pk) for pk in [post.pk for post in self.posts] + [missing])
+        response = self.like_state(ids)
+        self.assertEqual(response.status_code, 200)
+        # Posts the user has not liked, or that do not exist, are left out of 'liked'
+        self.assertEqual(response.data, {
+            'liked': [self.posts[0].pk],
+            'likes_count': {str(self.posts[0].pk): 2, str(self.posts[1].pk): 0, str(self.posts[2].pk): 1},
+        })
+
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.like_state(ids).data['liked'], [self.posts[0].pk, self.posts[2].pk])
+        self.assertEqual(self.like_state('').data, {'liked': [], 'likes_count': {}})
+
+    def test_invalid_ids(self):
+        for ids in ('1,two', '1;2', ','.join(str(pk) for pk in range(1, views.LIKE_STATE_MAX_IDS + 2))):
+            with self.subTest(ids=ids[:10]):
+                self.assertEqual(self.like_state(ids).status_code, 400)
+        self.assertEqual(self.like_state(','.join(str(pk) for pk in range(1, views.LIKE_STATE_MAX_IDS + 1))).status_code, 200)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.like_state(str(self.posts[0].pk)).status_code, 401)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TrendingTestCase(TestCase):
+    """
+    Scores halve every TRENDING_HALF_LIFE seconds; compact() decays them to
+    a common time before ranking.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.posts = [
+            Post.objects.create(author=self.author, title=f'Post {i}', content='content') for i in range(3)
+        ]
+        self.now = 1_700_000_000.0
+        patcher = mock.patch.object(trending.time, 'time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def score(self, post):
+        return PostScore.objects.get(post=post).score
+
+    def test_score_decays_between_events(self):
+        trending.record_like(self.posts[0].pk)
+        self.assertAlmostEqual(self.score(self.posts[0]), 1.0)
+
+        self.now += trending.TRENDING_HALF_LIFE
+        trending.record_comment(self.posts[0].pk)
+        self.assertAlmostEqual(self.score(self.posts[0]), 0.5 + 2.0)
+
+        self.now += 2 * trending.TRENDING_HALF_LIFE
+        trending.record_unlike(self.posts[0].pk)
+        self.assertAlmostEqual(self.score(self.posts[0]), 2.5 / 4 - 1.0)
+
+    def test_compact_ranks_decayed_scores(self):
+        # Older but heavier activity on post 0, a single recent like on post 1
+        for _ in range(5):
+            trending.record_comment(self.posts[0].pk)
+        trending.record_like(self.posts[2].pk)
+        self.now += 3 * trending.TRENDING_HALF_LIFE
+        trending.record_like(self.posts[1].pk)
+        self.now += trending.TRENDING_HALF_LIFE
+
+        self.assertEqual(trending.compact(size=2, min_score=0.2), (2, 1))
+        self.assertEqual(
+            [(entry.rank, entry.post_id) for entry in TrendingPost.objects.all()],
+            [(1, self.posts[0].pk), (2, self.posts[1].pk)],
+        )
+        self.assertAlmostEqual(TrendingPost.objects.get(rank=1).score, 10.0 / 16)
+        self.assertFalse(PostScore.objects.filter(post=self.posts[2]).exists())
+
+        response = APIClient().get('/api/posts/trending/')
+        self.assertEqual([post['id'] for post in response.data], [self.posts[0].pk, self.posts[1].pk])
+
+    def test_trending_queries_do_not_grow_with_the_posts(self):
+        reader = User.objects.create_user(username='reader', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(reader)
+        likes.add_like(reader, self.posts[1].pk)
+        trending.compact(size=1)
+        with CaptureQueriesContext(connection) as one:
+            client.get('/api/posts/trending/')
+
+        for post in self.posts:
+            trending.record_like(post.pk)
+        trending.compact()
+        with CaptureQueriesContext(connection) as three:
+            response = client.get('/api/posts/trending/')
+
+        self.assertEqual(len(three), len(one))
+        self.assertEqual(
+            {post['id']: post['liked_by_user'] for post in response.data},
+            {self.posts[0].pk: False, self.posts[1].pk: True, self.posts[2].pk: False},
+        )
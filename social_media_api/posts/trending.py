@@ -0,0 +1,73 @@
+"""
+Trending posts based on exponentially time-decayed activity scores.
+
+Every like and comment adds a weight to the post's PostScore row. The stored
+score is decayed to the event time in the same UPDATE that adds the weight:
+
+    score = score * 2 ** ((scored_at - now) / half_life) + weight
+
+so recording an event is one statement with no read and no lock held in
+Python. Scores of different posts are only comparable once decayed to a
+common time, which compact() does before writing the small TrendingPost
+table that the trending endpoint reads.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Power
+
+from .models import PostScore, TrendingPost
+
+TRENDING_HALF_LIFE = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 6) * 60 * 60
+TRENDING_LIKE_WEIGHT = getattr(settings, 'TRENDING_LIKE_WEIGHT', 1.0)
+TRENDING_COMMENT_WEIGHT = getattr(settings, 'TRENDING_COMMENT_WEIGHT', 2.0)
+TRENDING_SIZE = getattr(settings, 'TRENDING_SIZE', 50)
+
+
+def _decayed_score(now):
+    return F('score') * Power(Value(2.0), (F('scored_at') - Value(now)) / Value(float(TRENDING_HALF_LIFE)))
+
+
+def record_activity(post_id, weight):
+    """
+    Add weight to the post's decayed score at the current time.
+    """
+    now = time.time()
+    # score must be assigned before scored_at so backends that evaluate
+    # SET clauses left to right still decay from the old timestamp
+    updated = PostScore.objects.filter(post_id=post_id).update(score=_decayed_score(now) + weight, scored_at=now)
+    if not updated:
+        PostScore.objects.bulk_create([PostScore(post_id=post_id, score=0.0, scored_at=now)], ignore_conflicts=True)
+        PostScore.objects.filter(post_id=post_id).update(score=_decayed_score(now) + weight, scored_at=now)
+
+
+def record_like(post_id):
+    record_activity(post_id, TRENDING_LIKE_WEIGHT)
+
+
+def record_unlike(post_id):
+    record_activity(post_id, -TRENDING_LIKE_WEIGHT)
+
+
+def record_comment(post_id):
+    record_activity(post_id, TRENDING_COMMENT_WEIGHT)
+
+
+def compact(size=TRENDING_SIZE, min_score=0.01):
+    """
+    Decay every score to now, drop scores below min_score and rebuild the
+    top-size TrendingPost table. Returns (scores_kept, scores_pruned).
+    """
+    now = time.time()
+    with transaction.atomic():
+        PostScore.objects.update(score=_decayed_score(now), scored_at=now)
+        pruned, _ = PostScore.objects.filter(score__lt=min_score).delete()
+        top = list(PostScore.objects.order_by('-score').values_list('post_id', 'score')[:size])
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create([
+            TrendingPost(rank=rank, post_id=post_id, score=score)
+            for rank, (post_id, score) in enumerate(top, start=1)
+        ])
+    return PostScore.objects.count(), pruned
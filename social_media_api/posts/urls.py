@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet, FeedView, like_post, unlike_post
+from .views import PostViewSet, CommentViewSet, FeedView, like_post, unlike_post, toggle_like_post
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet, basename='post')
@@ -11,4 +11,5 @@ urlpatterns = [
     path('feed/', FeedView.as_view(), name='feed'),
     path('posts/<int:pk>/like/', like_post, name='like-post'),
     path('posts/<int:pk>/unlike/', unlike_post, name='unlike-post'),
+    path('posts/<int:pk>/like/toggle/', toggle_like_post, name='toggle-like-post'),
 ]
\ No newline at end of file
@@ -1,15 +1,29 @@
 from rest_framework import viewsets, permissions, filters, status, generics
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.contrib.contenttypes.models import ContentType
-from .models import Post, Comment, Like
+from accounts.graph import get_following_ids
+from social_media_api.throttling import scoped_throttle
+from .models import Post, Comment, Like, TrendingPost
+from .trending import record_comment
+from .likes import add_like, remove_like, toggle_like
 from .serializers import PostSerializer, CommentSerializer, LikeSerializer
 
 User = get_user_model()
 
+# posts.like_buffer is only imported when buffering is on, so ordinary
+# workers never create the buffer or register its exit hook
+LIKE_BUFFER_ENABLED = getattr(settings, 'LIKE_BUFFER_ENABLED', False)
+
+LIKE_STATE_MAX_IDS = 500
+
+# Per-user and per-IP buckets shared by the like, unlike and toggle endpoints
+LIKE_THROTTLES = [scoped_throttle('likes')]
+
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
     """
@@ -45,15 +59,74 @@ class PostViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        Top posts by time-decayed like/comment activity, read from the
+        precomputed TrendingPost table (rebuilt by compact_trending).
+        """
+        entries = (
+            TrendingPost.objects
+            .select_related('post__author')
+            .prefetch_related('post__comments__author')
+            .order_by('rank')
+        )
+        posts = [entry.post for entry in entries]
+        liked_post_ids = set()
+        if request.user.is_authenticated:
+            liked_post_ids = set(
+                Like.objects.filter(user=request.user, post_id__in=[post.pk for post in posts])
+                .values_list('post_id', flat=True)
+            )
+        context = {**self.get_serializer_context(), 'liked_post_ids': liked_post_ids}
+        serializer = self.get_serializer(posts, many=True, context=context)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='like-state',
+            permission_classes=[permissions.IsAuthenticated])
+    def like_state(self, request):
+        """
+        Like state for many posts at once: ?ids=1,2,3 returns which of them the
+        user has liked and their current like counts, in one query each.
+        """
+        try:
+            ids = {int(value) for value in request.query_params.get('ids', '').split(',') if value}
+        except ValueError:
+            return Response(
+                {'error': 'ids must be a comma-separated list of post ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > LIKE_STATE_MAX_IDS:
+            return Response(
+                {'error': f'At most {LIKE_STATE_MAX_IDS} ids can be requested at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Served by the (user, post) unique index on Like
+        liked = Like.objects.filter(user=request.user, post_id__in=ids).values_list('post_id', flat=True)
+        counts = Post.objects.filter(pk__in=ids).values_list('pk', 'likes_count')
+        return Response({
+            'liked': sorted(liked),
+            'likes_count': {str(pk): likes_count for pk, likes_count in counts},
+        })
+
 
 class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = StandardResultsSetPagination
+    throttle_scope = 'comments'
+
+    def get_throttles(self):
+        # Only new comments are rate limited
+        if self.action != 'create':
+            return []
+        return super().get_throttles()
 
     def perform_create(self, serializer):
         comment = serializer.save(author=self.request.user)
+        record_comment(comment.post_id)
         
         # Create notification for post author
         from notifications.models import Notification
@@ -80,11 +153,11 @@ class FeedView(generics.ListAPIView):
         # Get the current user
         user = self.request.user
         
-        # Get users that the current user is following
-        following_users = user.following.all()
+        # Get ids of users that the current user is following (cached per user)
+        following_ids = get_following_ids(user.id)
         
         # Return posts from followed users, ordered by creation date (newest first)
-        return Post.objects.filter(author__in=following_users).order_by('-created_at')
+        return Post.objects.filter(author_id__in=list(following_ids)).order_by('-created_at')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -94,14 +167,27 @@ class FeedView(generics.ListAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes(LIKE_THROTTLES)
 def like_post(request, pk):
     """
-    Like a post. Uses get_or_create to prevent duplicate likes and creates a notification.
+    Like a post. Duplicate likes are rejected by the (user, post) unique index
+    and the post author is notified of new likes.
+    
+    With LIKE_BUFFER_ENABLED the like is queued and written in a batch later;
+    the response is 202 with an estimated count and duplicates are dropped
+    silently at flush time.
     """
-    post = generics.get_object_or_404(Post, pk=pk)
+    if LIKE_BUFFER_ENABLED:
+        from .like_buffer import queue_like
+        return Response(
+            {
+                'message': 'Post like queued',
+                'likes_count': queue_like(request.user, pk)
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
     
-    # Use get_or_create to handle liking
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
+    created, likes_count = add_like(request.user, pk)
     
     if not created:
         # Like already existed
@@ -110,20 +196,10 @@ def like_post(request, pk):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Create notification for post author (don't notify if liking own post)
-    if post.author != request.user:
-        from notifications.models import Notification
-        Notification.objects.create(
-            recipient=post.author,
-            actor=request.user,
-            verb='liked your post',
-            target=post
-        )
-    
     return Response(
         {
             'message': 'Post liked successfully',
-            'likes_count': post.likes.count()
+            'likes_count': likes_count
         },
         status=status.HTTP_201_CREATED
     )
@@ -131,26 +207,83 @@ def like_post(request, pk):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes(LIKE_THROTTLES)
 def unlike_post(request, pk):
     """
     Unlike a post. Removes the like if it exists.
     """
-    post = generics.get_object_or_404(Post, pk=pk)
+    if LIKE_BUFFER_ENABLED:
+        from .like_buffer import unqueue_like
+        likes_count = unqueue_like(request.user, pk)
+        if likes_count is not None:
+            return Response(
+                {
+                    'message': 'Post unliked successfully',
+                    'likes_count': likes_count
+                },
+                status=status.HTTP_200_OK
+            )
     
-    # Check if like exists
-    try:
-        like = Like.objects.get(user=request.user, post=post)
-        like.delete()
-        
+    deleted, likes_count = remove_like(request.user, pk)
+    
+    if not deleted:
         return Response(
-            {
-                'message': 'Post unliked successfully',
-                'likes_count': post.likes.count()
-            },
-            status=status.HTTP_200_OK
+            {'error': 'You have not liked this post'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-    except Like.DoesNotExist:
+    
+    return Response(
+        {
+            'message': 'Post unliked successfully',
+            'likes_count': likes_count
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes(LIKE_THROTTLES)
+def toggle_like_post(request, pk):
+    """
+    Flip the user's like on a post, or set it explicitly with {"liked": true/false}.
+    Setting an explicit state is idempotent, so retried or double-tapped
+    requests cannot double count.
+    """
+    liked = request.data.get('liked')
+    if liked is not None and not isinstance(liked, bool):
         return Response(
-            {'error': 'You have not liked this post'},
+            {'error': '"liked" must be true or false'},
             status=status.HTTP_400_BAD_REQUEST
-        )
\ No newline at end of file
+        )
+    
+    if LIKE_BUFFER_ENABLED:
+        from .like_buffer import queue_like, unqueue_like
+        if liked:
+            return Response(
+                {
+                    'liked': True,
+                    'likes_count': queue_like(request.user, pk)
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        # Unliking or flipping: a like still waiting in the buffer is the
+        # current state, so take it back before looking at the database
+        likes_count = unqueue_like(request.user, pk)
+        if likes_count is not None:
+            return Response(
+                {
+                    'liked': False,
+                    'likes_count': likes_count
+                },
+                status=status.HTTP_200_OK
+            )
+    
+    liked, likes_count = toggle_like(request.user, pk, liked)
+    return Response(
+        {
+            'liked': liked,
+            'likes_count': likes_count
+        },
+        status=status.HTTP_200_OK
+    )
@@ -5,6 +5,8 @@ Production settings for social_media_api project.
 import os
 from pathlib import Path
 
+from social_media_api.database import database_config, replica_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,6 +39,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'social_media_api.middleware.DatabaseConnectionTimingMiddleware',
+    'social_media_api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,18 +72,30 @@ TEMPLATES = [
 WSGI_APPLICATION = 'social_media_api.wsgi.application'
 
 # Database
-# Use PostgreSQL in production
+# Use PostgreSQL in production, with connection reuse (and optionally a pool)
+# configured in social_media_api/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.environ.get('DB_NAME'),
-        'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASSWORD'),
-        'HOST': os.environ.get('DB_HOST'),
-        'PORT': os.environ.get('DB_PORT', '5432'),
-    }
+    'default': database_config(BASE_DIR, require_postgresql=True),
+    **replica_databases(),
 }
 
+# Safe requests read from the DB_REPLICA_URLS replicas; a client that wrote
+# stays on the primary for REPLICA_PIN_SECONDS (see social_media_api/routers.py)
+DATABASE_ROUTERS = ['social_media_api.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+# Cache shared by all workers, which the following sets (accounts/graph.py)
+# and the throttle buckets rely on. Without REDIS_URL every process has its
+# own local-memory cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,6 +126,8 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads above this size are streamed to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -130,6 +148,18 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
     ],
+    # Token buckets for views with a throttle_scope (see social_media_api/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'social_media_api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'likes': '120/min',
+        'likes.ip': '600/min',
+        'comments': '30/min',
+        'comments.ip': '120/min',
+    },
+    # Client IPs are read from X-Forwarded-For as appended by nginx
+    'NUM_PROXIES': 1,
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
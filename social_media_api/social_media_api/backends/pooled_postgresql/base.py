@@ -0,0 +1,183 @@
+"""
+PostgreSQL backend that takes connections from an in-process pool.
+
+Django (before 5.1) keeps at most one persistent connection per thread, so a
+threaded worker either reconnects on every request (CONN_MAX_AGE = 0) or
+holds a connection per thread forever. This backend shares a bounded pool
+among all threads of a worker process: Django "closing" a connection at the
+end of a request hands it back to the pool instead.
+
+Configure it through social_media_api.database.database_config (DB_POOL=true);
+the settings dict carries a POOL entry with MIN_SIZE, MAX_SIZE and TIMEOUT.
+"""
+import os
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions, extras
+
+from social_media_api.database import record_connection_wait
+
+Database = base.Database
+
+# Idle connections older than this are checked with a round trip before reuse
+HEALTH_CHECK_AFTER = 30
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections that blocks up to timeout
+    seconds when all max_size connections are in use.
+
+    The lock only guards the idle list and the count of open connections:
+    connecting and health checks happen outside it, on a slot reserved in
+    that count, so one slow server round trip does not stall every thread.
+    """
+
+    def __init__(self, conn_params, min_size, max_size, timeout, health_checks):
+        self.conn_params = conn_params
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self.pid = os.getpid()
+        self._idle = []
+        self._size = 0
+        self._available = threading.Condition()
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+        self._size = len(self._idle)
+
+    def _connect(self):
+        connection = Database.connect(**self.conn_params)
+        # Same as Django's backend: skip psycopg2's JSON decoding
+        extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _free_slot(self):
+        with self._available:
+            self._size -= 1
+            self._available.notify()
+
+    def _discard(self, connection):
+        self._free_slot()
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def _usable(self, connection, idle_since):
+        if connection.closed:
+            return False
+        if not self.health_checks or time.monotonic() - idle_since < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Database.Error:
+            return False
+
+    def _reserve(self, deadline):
+        """
+        Take an idle connection as (connection, idle_since), or count a new
+        one as open and return (None, None), waiting until deadline for either.
+        """
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Database.OperationalError(
+                        f'Connection pool exhausted: all {self.max_size} connections in use '
+                        f'for {self.timeout}s'
+                    )
+                self._available.wait(remaining)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, idle_since = self._reserve(deadline)
+            if connection is None:
+                try:
+                    return self._connect()
+                except BaseException:
+                    # Give the reserved slot back to the next waiter
+                    self._free_slot()
+                    raise
+            if self._usable(connection, idle_since):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection, discard=False):
+        with self._available:
+            if discard or connection.closed:
+                self._discard(connection)
+            else:
+                if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                self._idle.append((connection, time.monotonic()))
+            self._available.notify()
+
+    def close(self):
+        with self._available:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._discard(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        # A pool inherited through fork shares sockets with the parent; start a new one
+        if pool is None or pool.pid != os.getpid():
+            options = settings_dict.get('POOL', {})
+            pool = _pools[alias] = ConnectionPool(
+                conn_params,
+                min_size=options.get('MIN_SIZE', 1),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 5),
+                health_checks=settings_dict['CONN_HEALTH_CHECKS'],
+            )
+        return pool
+
+
+def close_pools():
+    """
+    Close every idle pooled connection, e.g. in the gunicorn master before forking.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            if pool.pid == os.getpid():
+                pool.close()
+        _pools.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        isolation_level = options.get('isolation_level')
+        self.isolation_level = base.IsolationLevel(isolation_level) if isolation_level is not None \
+            else base.IsolationLevel.READ_COMMITTED
+
+        started = time.monotonic()
+        connection = get_pool(self.alias, self.settings_dict, conn_params).acquire()
+        record_connection_wait(time.monotonic() - started)
+
+        connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                pool = get_pool(self.alias, self.settings_dict, self.get_connection_params())
+                pool.release(self.connection, discard=self.errors_occurred)
@@ -0,0 +1,129 @@
+"""
+Database configuration shared by settings.py and settings_production.py.
+
+database_config() builds the 'default' database from the environment, in
+this order of precedence:
+
+    DATABASE_URL   any database dj-database-url understands (Heroku)
+    DB_NAME        PostgreSQL from DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT
+    (neither)      SQLite file next to manage.py, tuned for concurrent use
+                   by social_media_api/sqlite.py (WAL, busy timeout, in-memory caches)
+
+Connection reuse applies to every engine:
+
+    DB_CONN_MAX_AGE        seconds a connection is kept between requests (default 600)
+    DB_CONN_HEALTH_CHECKS  check a reused connection before the first query (default true)
+
+For PostgreSQL with threaded workers (GUNICORN_PROFILE=gthread), DB_POOL=true
+switches to the pooled_postgresql backend, which shares one pool of
+DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections among the threads of a worker
+and waits up to DB_POOL_TIMEOUT seconds for a free one.
+
+Read replicas are listed in DB_REPLICA_URLS (comma-separated URLs, e.g.
+sqlite:////path/to/replica.sqlite3 locally) and become the replica1..N
+aliases used by social_media_api.routers.PrimaryReplicaRouter.
+
+The time requests spend waiting for a connection is accumulated here and
+reported by social_media_api.middleware.DatabaseConnectionTimingMiddleware.
+"""
+import os
+from contextvars import ContextVar
+
+# Importing sqlite registers apply_sqlite_pragmas() for every connection
+from social_media_api.sqlite import SQLITE_PRAGMAS, sqlite_database
+
+POOLED_POSTGRESQL_ENGINE = 'social_media_api.backends.pooled_postgresql'
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def parse_database_url(url):
+    import dj_database_url
+    # sslmode only applies to network databases; sqlite3.connect() rejects it
+    ssl_require = env_bool('DB_SSL_REQUIRE', True) and not url.startswith('sqlite')
+    return dj_database_url.parse(url, ssl_require=ssl_require)
+
+
+def apply_connection_settings(config):
+    """
+    Add connection reuse, pooling and SQLite pragmas to a settings dict.
+    """
+    config['CONN_MAX_AGE'] = env_int('DB_CONN_MAX_AGE', 600)
+    config['CONN_HEALTH_CHECKS'] = env_bool('DB_CONN_HEALTH_CHECKS', True)
+
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        config.setdefault('PRAGMAS', dict(SQLITE_PRAGMAS))
+    elif env_bool('DB_POOL', False) and config['ENGINE'] == 'django.db.backends.postgresql':
+        config['ENGINE'] = POOLED_POSTGRESQL_ENGINE
+        # Hand the connection back to the pool at the end of every request
+        config['CONN_MAX_AGE'] = 0
+        config['POOL'] = {
+            'MIN_SIZE': env_int('DB_POOL_MIN_SIZE', 1),
+            'MAX_SIZE': env_int('DB_POOL_MAX_SIZE', 10),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+        }
+    return config
+
+
+def database_config(base_dir, require_postgresql=False):
+    """
+    Return the settings dict for the 'default' database.
+    """
+    if 'DATABASE_URL' in os.environ:
+        config = parse_database_url(os.environ['DATABASE_URL'])
+    elif os.environ.get('DB_NAME') or require_postgresql:
+        config = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME'),
+            'USER': os.environ.get('DB_USER'),
+            'PASSWORD': os.environ.get('DB_PASSWORD'),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
+    else:
+        config = sqlite_database(base_dir / 'db.sqlite3')
+    return apply_connection_settings(config)
+
+
+def replica_databases():
+    """
+    Return {'replica1': {...}, ...} for the comma-separated DB_REPLICA_URLS.
+
+    SQLite replicas whose file does not exist are left out, so reads fall
+    back to the primary instead of hitting an empty database.
+    """
+    replicas = {}
+    urls = [url.strip() for url in os.environ.get('DB_REPLICA_URLS', '').split(',') if url.strip()]
+    for number, url in enumerate(urls, start=1):
+        config = parse_database_url(url)
+        if config['ENGINE'] == 'django.db.backends.sqlite3' and not os.path.exists(config['NAME']):
+            continue
+        # Tests read through the primary's test database
+        config['TEST'] = {'MIRROR': 'default'}
+        replicas[f'replica{number}'] = apply_connection_settings(config)
+    return replicas
+
+
+# Seconds spent acquiring database connections during the current request
+_connection_wait = ContextVar('connection_wait', default=None)
+
+
+def start_connection_timing():
+    return _connection_wait.set([0.0])
+
+
+def stop_connection_timing(token):
+    waited = _connection_wait.get()
+    _connection_wait.reset(token)
+    return waited[0] if waited else 0.0
+
+
+def record_connection_wait(seconds):
+    waited = _connection_wait.get()
+    if waited is not None:
+        waited[0] += seconds
@@ -0,0 +1,68 @@
+import logging
+
+from django.conf import settings
+
+from rest_framework.permissions import SAFE_METHODS
+
+from .database import start_connection_timing, stop_connection_timing
+from .routers import DATABASE_REPLICAS, finish_request_routing, start_request_routing
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_ACQUIRE_MS = getattr(settings, 'DB_SLOW_ACQUIRE_MS', 100)
+REPLICA_PIN_COOKIE = getattr(settings, 'REPLICA_PIN_COOKIE', 'db_primary')
+REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+class DatabaseConnectionTimingMiddleware:
+    """
+    Measure how long each request waits to get a database connection.
+
+    The wait is reported in a Server-Timing header (db-acquire) and logged as
+    a warning above DB_SLOW_ACQUIRE_MS, which makes pool exhaustion visible.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_connection_timing()
+        try:
+            response = self.get_response(request)
+        finally:
+            waited_ms = stop_connection_timing(token) * 1000
+        if waited_ms:
+            response['Server-Timing'] = f'db-acquire;dur={waited_ms:.1f}'
+            if waited_ms > DB_SLOW_ACQUIRE_MS:
+                logger.warning('Waited %.1f ms for a database connection on %s', waited_ms, request.path)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe requests read from database replicas, with read-your-writes.
+
+    A request that writes (an unsafe method, or any ORM write) sets a cookie
+    that keeps the client on the primary for REPLICA_PIN_SECONDS, long enough
+    for the replicas to catch up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        safe = request.method in SAFE_METHODS
+        token = start_request_routing(allow_replica=safe and REPLICA_PIN_COOKIE not in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing = finish_request_routing(token)
+        if not safe or routing.wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+        return response
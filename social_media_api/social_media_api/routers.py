@@ -0,0 +1,104 @@
+"""
+Primary/replica database routing.
+
+Reads go to a replica only inside a request that ReplicaRoutingMiddleware
+allowed to (a safe method from a client not pinned to the primary); writes,
+and every read after a write in the same request, go to 'default'. Code
+outside requests (management commands, the like buffer thread) always uses
+the primary.
+
+A replica that fails to connect is skipped for REPLICA_RETRY_SECONDS, and
+with no replica available reads fall back to the primary.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+DATABASE_REPLICAS = getattr(settings, 'DATABASE_REPLICAS', [])
+REPLICA_RETRY_SECONDS = getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+# Auth lookups right after login or registration must see the new rows
+PRIMARY_ONLY_APPS = getattr(settings, 'PRIMARY_ONLY_APPS', ('authtoken', 'sessions'))
+
+
+class RequestRouting:
+    """
+    Routing state of the current request.
+    """
+
+    def __init__(self, allow_replica):
+        self.allow_replica = allow_replica
+        self.read_alias = None
+        self.wrote = False
+
+
+_routing = ContextVar('db_routing', default=None)
+
+# Replica alias -> time.monotonic() of its last connection failure
+_unavailable = {}
+
+
+def start_request_routing(allow_replica):
+    return _routing.set(RequestRouting(allow_replica))
+
+
+def finish_request_routing(token):
+    routing = _routing.get()
+    _routing.reset(token)
+    return routing
+
+
+def replica_available(alias):
+    failed_at = _unavailable.get(alias)
+    if failed_at is not None and time.monotonic() - failed_at < REPLICA_RETRY_SECONDS:
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning('Database replica %s is unavailable, reading from the primary', alias)
+        _unavailable[alias] = time.monotonic()
+        return False
+    _unavailable.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    for alias in random.sample(DATABASE_REPLICAS, len(DATABASE_REPLICAS)):
+        if replica_available(alias):
+            return alias
+    return PRIMARY
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None:
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        # One replica per request, so its reads see a single snapshot
+        if routing.read_alias is None:
+            routing.read_alias = choose_replica() if routing.allow_replica else PRIMARY
+        return routing.read_alias
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.read_alias = PRIMARY
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
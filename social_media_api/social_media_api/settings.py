@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 
+from social_media_api.database import database_config, replica_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'social_media_api.middleware.DatabaseConnectionTimingMiddleware',
+    'social_media_api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -84,35 +88,30 @@ WSGI_APPLICATION = 'social_media_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-# Default database configuration (SQLite for development)
+# SQLite for development, PostgreSQL from DB_* variables or DATABASE_URL (Heroku).
+# Connection reuse and the optional pool are configured in social_media_api/database.py.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
+    **replica_databases(),
 }
 
-# Production database configuration (PostgreSQL)
-if os.environ.get('DB_NAME'):
-    DATABASES = {
+# Safe requests read from the DB_REPLICA_URLS replicas; a client that wrote
+# stays on the primary for REPLICA_PIN_SECONDS (see social_media_api/routers.py)
+DATABASE_ROUTERS = ['social_media_api.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+# Cache shared by all workers, which the following sets (accounts/graph.py)
+# and the throttle buckets rely on. Without REDIS_URL every process has its
+# own local-memory cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.environ.get('DB_NAME'),
-            'USER': os.environ.get('DB_USER'),
-            'PASSWORD': os.environ.get('DB_PASSWORD'),
-            'HOST': os.environ.get('DB_HOST', 'localhost'),
-            'PORT': os.environ.get('DB_PORT', '5432'),
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
         }
     }
 
-# Heroku database configuration
-import dj_database_url
-if 'DATABASE_URL' in os.environ:
-    DATABASES['default'] = dj_database_url.config(
-        conn_max_age=600,
-        ssl_require=True
-    )
-
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -157,6 +156,8 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files configuration
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads above this size are streamed to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
 
 # AWS S3 Configuration for media files (optional, for production)
 if os.environ.get('AWS_STORAGE_BUCKET_NAME'):
@@ -192,6 +193,16 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
     ],
+    # Token buckets for views with a throttle_scope (see social_media_api/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'social_media_api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'likes': '120/min',
+        'likes.ip': '600/min',
+        'comments': '30/min',
+        'comments.ip': '120/min',
+    },
 }
 
 # Security Settings for Production
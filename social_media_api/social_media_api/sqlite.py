@@ -0,0 +1,53 @@
+"""
+SQLite tuning for concurrent readers and writers.
+
+sqlite_database() returns a DATABASES entry whose PRAGMAS are applied to
+every new connection by the connection_created hook below:
+
+    journal_mode=WAL      readers no longer block on (or block) the writer
+    synchronous=NORMAL    durable enough with WAL, without an fsync per commit
+    busy_timeout          writers wait for the lock instead of failing with
+                          "database is locked"
+    cache_size, mmap_size, temp_store
+                          keep hot pages, the file and temp tables in memory
+
+Each project of this repository is deployed on its own and cannot import
+from the others, so this module is copied unchanged into every project
+that uses SQLite. social_media_api/social_media_api/sqlite.py is the
+reference; the copies are django_blog/django_blog/sqlite.py and
+LibraryProject/sqlite.py in django-models and advanced_features_and_security.
+Change the reference and copy the file over the others.
+"""
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds
+    'cache_size': -64000,  # negative means KiB: 64 MB per connection
+    'mmap_size': 268435456,  # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_database(name, **pragmas):
+    """
+    Settings dict for an SQLite database with SQLITE_PRAGMAS, overridden by
+    any keyword arguments (e.g. busy_timeout=10000).
+    """
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'PRAGMAS': {**SQLITE_PRAGMAS, **pragmas},
+    }
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
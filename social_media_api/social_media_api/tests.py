@@ -0,0 +1,288 @@
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from psycopg2 import extensions
+from rest_framework.test import APIClient
+
+from posts.models import Post
+
+from . import database, middleware, routers, throttling
+from .backends.pooled_postgresql import base as pooled
+
+User = get_user_model()
+
+
+@mock.patch.object(middleware, 'DATABASE_REPLICAS', ['replica1'])
+@mock.patch.object(routers, 'DATABASE_REPLICAS', ['replica1'])
+@mock.patch.object(routers, 'replica_available', lambda alias: True)
+class PrimaryReplicaRouterTestCase(TestCase):
+    """
+    Safe requests read from a replica unless the client wrote recently; every
+    read after a write goes to the primary.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = routers.PrimaryReplicaRouter()
+        self.user = User.objects.create_user(username='author', password='testpass123')
+
+    def run_request(self, request, view):
+        return middleware.ReplicaRoutingMiddleware(view)(request)
+
+    def read_alias_view(self, seen):
+        def view(request):
+            seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+        return view
+
+    def test_safe_request_reads_from_replica(self):
+        seen = []
+        response = self.run_request(self.factory.get('/api/posts/'), self.read_alias_view(seen))
+
+        self.assertEqual(seen, ['replica1'])
+        self.assertNotIn(middleware.REPLICA_PIN_COOKIE, response.cookies)
+        # Outside a request the router has no opinion, so Django uses 'default'
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_write_pins_client_to_primary(self):
+        response = self.run_request(self.factory.post('/api/posts/'), lambda request: HttpResponse(status=201))
+        cookie = response.cookies[middleware.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], middleware.REPLICA_PIN_SECONDS)
+
+        seen = []
+        request = self.factory.get('/api/posts/')
+        request.COOKIES[middleware.REPLICA_PIN_COOKIE] = cookie.value
+        self.run_request(request, self.read_alias_view(seen))
+        self.assertEqual(seen, ['default'])
+
+    def test_reads_after_write_in_safe_request_use_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Post))
+            Post.objects.create(author=self.user, title='Title', content='content')
+            seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = self.run_request(self.factory.get('/api/feed/'), view)
+
+        self.assertEqual(seen, ['replica1', 'default'])
+        self.assertIn(middleware.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_auth_tables_and_unavailable_replicas_use_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Token))
+            return self.read_alias_view(seen)(request)
+
+        with mock.patch.object(routers, 'replica_available', lambda alias: False):
+            self.run_request(self.factory.get('/api/posts/'), view)
+
+        self.assertEqual(seen, ['default', 'default'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'likes': '3/min', 'likes.ip': '5/min', 'comments': '2/min', 'comments.ip': None},
+})
+class TokenBucketThrottleTestCase(TestCase):
+    """
+    Write endpoints with a throttle scope allow a burst of the rate's number
+    of requests per user and per IP, then refill at the average rate.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Title', content='content')
+        self.now = 1_700_000_000.0
+        timer = mock.patch.object(throttling.TokenBucketThrottle, 'timer', mock.Mock(side_effect=lambda: self.now))
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def client_for(self, username, ip='10.0.0.1'):
+        client = APIClient(REMOTE_ADDR=ip)
+        client.force_authenticate(User.objects.create_user(username=username, password='testpass123'))
+        return client
+
+    def toggle(self, client):
+        return client.post(f'/api/posts/{self.post.pk}/like/toggle/').status_code
+
+    def test_burst_then_refill(self):
+        client = self.client_for('reader')
+        self.assertEqual([self.toggle(client) for _ in range(4)], [200, 200, 200, 429])
+
+        response = client.post(f'/api/posts/{self.post.pk}/like/toggle/')
+        # One token every 20 seconds
+        self.assertEqual(int(response['Retry-After']), 20)
+
+        self.now += 20
+        self.assertEqual([self.toggle(client) for _ in range(2)], [200, 429])
+        # Idle buckets refill only up to the burst size
+        self.now += 3600
+        self.assertEqual([self.toggle(client) for _ in range(4)], [200, 200, 200, 429])
+
+    def test_ip_bucket_is_shared_by_users(self):
+        first, second = self.client_for('first'), self.client_for('second')
+        statuses = [self.toggle(first) for _ in range(3)] + [self.toggle(second) for _ in range(3)]
+
+        self.assertEqual(statuses, [200, 200, 200, 200, 200, 429])
+        # The request denied by the IP bucket took no token from the user's bucket
+        second.defaults['REMOTE_ADDR'] = '10.0.0.2'
+        self.assertEqual(self.toggle(second), 200)
+        self.assertEqual(self.toggle(second), 429)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        first, second, third = self.client_for('first'), self.client_for('second'), self.client_for('third')
+        # Every request claims another address, but all of them come from 10.0.0.1
+        statuses = [
+            client.post(f'/api/posts/{self.post.pk}/like/toggle/', HTTP_X_FORWARDED_FOR=f'203.0.113.{i}').status_code
+            for i, client in enumerate([first, first, first, second, second, third])
+        ]
+
+        self.assertEqual(statuses, [200, 200, 200, 200, 200, 429])
+
+    def test_only_comment_creation_is_throttled(self):
+        client = self.client_for('reader')
+        data = {'post': self.post.pk, 'content': 'Nice'}
+
+        statuses = [client.post('/api/comments/', data).status_code for _ in range(3)]
+        self.assertEqual(statuses, [201, 201, 429])
+        # Listing comments has no bucket, and no rate disables the IP bucket
+        self.assertEqual(client.get('/api/comments/').status_code, 200)
+
+    def test_concurrent_requests_take_exact_number_of_tokens(self):
+        # LocMemCache.incr is atomic within the process, like Redis and Memcached across processes
+        taken = []
+
+        def take():
+            for _ in range(50):
+                taken.append(throttling.take_token('throttle:test', 100, 60, self.now) == 0)
+
+        threads = [threading.Thread(target=take) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(taken.count(True), 100)
+
+
+class ConnectionPoolTestCase(TestCase):
+    """
+    The pool hands out idle connections first, opens new ones up to max_size
+    outside its lock, and makes acquire() wait until timeout for a release.
+    """
+
+    def setUp(self):
+        self.opened = []
+        patcher = mock.patch.object(pooled.Database, 'connect', side_effect=self.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(pooled.extras, 'register_default_jsonb')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = pooled.ConnectionPool({}, min_size=1, max_size=2, timeout=0.05, health_checks=True)
+
+    def connect(self):
+        connection = mock.MagicMock(closed=False)
+        connection.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+        self.opened.append(connection)
+        return connection
+
+    def test_acquire_release_and_timeout(self):
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.assertEqual([first, second], self.opened)
+        with self.assertRaisesMessage(pooled.Database.OperationalError, 'all 2 connections in use'):
+            self.pool.acquire()
+
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(), first)
+        # A discarded connection is closed and frees its slot for a new one
+        self.pool.release(second, discard=True)
+        second.close.assert_called_once_with()
+        self.assertIsNot(self.pool.acquire(), second)
+        self.assertEqual(len(self.opened), 3)
+
+    def test_waiting_acquire_gets_released_connection(self):
+        self.pool.timeout = 5
+        first, second = self.pool.acquire(), self.pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(self.pool.acquire()))
+        waiter.start()
+        self.pool.release(second)
+        waiter.join()
+        self.assertEqual(acquired, [second])
+
+    def test_connects_outside_the_lock(self):
+        self.pool.acquire()
+        lock_free = []
+
+        def connect():
+            # Another thread can take the lock while this one connects
+            def try_lock():
+                if self.pool._available.acquire(timeout=1):
+                    lock_free.append(True)
+                    self.pool._available.release()
+
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            return self.connect()
+
+        with mock.patch.object(pooled.Database, 'connect', side_effect=connect):
+            self.pool.acquire()
+        self.assertEqual(lock_free, [True])
+
+    def test_failed_connect_gives_the_slot_back(self):
+        self.pool.acquire()
+        with mock.patch.object(pooled.Database, 'connect', side_effect=pooled.Database.OperationalError('refused')):
+            with self.assertRaises(pooled.Database.OperationalError):
+                self.pool.acquire()
+        self.pool.acquire()
+        self.assertEqual(len(self.opened), 2)
+
+    def test_stale_idle_connection_is_replaced(self):
+        idle = self.opened[0]
+        idle.cursor.return_value.__enter__.return_value.execute.side_effect = pooled.Database.OperationalError
+        with mock.patch.object(pooled.time, 'monotonic', return_value=time.monotonic() + pooled.HEALTH_CHECK_AFTER):
+            connection = self.pool.acquire()
+        self.assertIsNot(connection, idle)
+        idle.close.assert_called_once_with()
+        self.assertEqual(self.pool._size, 1)
+
+
+class DatabaseConnectionTimingMiddlewareTestCase(TestCase):
+    """
+    Time spent acquiring connections during a request is reported in a
+    Server-Timing header, and logged when it exceeds DB_SLOW_ACQUIRE_MS.
+    """
+
+    def respond(self, *waits):
+        def get_response(request):
+            for seconds in waits:
+                database.record_connection_wait(seconds)
+            return HttpResponse()
+
+        return middleware.DatabaseConnectionTimingMiddleware(get_response)(RequestFactory().get('/api/posts/'))
+
+    def test_no_wait_no_header(self):
+        self.assertNotIn('Server-Timing', self.respond())
+        # Outside a timed request a wait is not recorded anywhere
+        database.record_connection_wait(1)
+        self.assertNotIn('Server-Timing', self.respond())
+
+    def test_waits_are_summed_and_slow_ones_logged(self):
+        with self.assertNoLogs('social_media_api.middleware'):
+            self.assertEqual(self.respond(0.01, 0.02)['Server-Timing'], 'db-acquire;dur=30.0')
+        with self.assertLogs('social_media_api.middleware', 'WARNING') as logs:
+            self.assertEqual(self.respond(0.25)['Server-Timing'], 'db-acquire;dur=250.0')
+        self.assertIn('Waited 250.0 ms for a database connection on /api/posts/', logs.output[0])
@@ -0,0 +1,77 @@
+"""
+Process warm-up for faster worker boot.
+
+warm_up() does the one-off work a fresh process would otherwise do on its
+first requests: importing every view and serializer, building the URL
+resolver, resolving DRF's configured classes and filling the ContentType
+cache. Run it in the gunicorn master with preload_app (see the when_ready
+hook in gunicorn_config.py), and every forked worker starts with all of it
+already in memory.
+"""
+import importlib
+import importlib.util
+import logging
+import time
+
+from django.apps import apps
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def import_app_modules(module_names=('serializers', 'views', 'urls')):
+    """
+    Import the given submodules of every project app that has them.
+    """
+    for app_config in apps.get_app_configs():
+        for module_name in module_names:
+            if importlib.util.find_spec(f'{app_config.name}.{module_name}') is not None:
+                importlib.import_module(f'{app_config.name}.{module_name}')
+
+
+def populate_url_resolver():
+    # Resolving the URLconf imports every view and compiles every pattern
+    resolver = get_resolver()
+    resolver._populate()
+    return resolver
+
+
+def load_rest_framework_settings():
+    from rest_framework.settings import api_settings
+
+    for setting in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                    'DEFAULT_PARSER_CLASSES', 'DEFAULT_PAGINATION_CLASS', 'DEFAULT_FILTER_BACKENDS'):
+        getattr(api_settings, setting)
+
+
+def prime_content_types():
+    """
+    Load the ContentType of every model into ContentTypeManager's cache.
+    Returns False if the database is not reachable yet.
+    """
+    from django.contrib.contenttypes.models import ContentType
+
+    try:
+        ContentType.objects.get_for_models(*apps.get_models())
+    except DatabaseError:
+        logger.warning('Skipping ContentType cache warm-up: database unavailable')
+        return False
+    finally:
+        # Never hand an open connection to forked workers
+        connections.close_all()
+    return True
+
+
+def warm_up():
+    """
+    Run every warm-up step and return the time it took in seconds.
+    """
+    started = time.monotonic()
+    import_app_modules()
+    populate_url_resolver()
+    load_rest_framework_settings()
+    prime_content_types()
+    elapsed = time.monotonic() - started
+    logger.info('Warm-up finished in %.3fs', elapsed)
+    return elapsed